@@ -2,8 +2,8 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from pathlib import Path
-from utils.database import get_db_connection, get_all_listings, get_summary_stats
-from utils.data_processing import enrich_dataframe, format_currency, format_percentage
+from utils.database import get_all_listings, get_summary_stats
+from utils.data_processing import enrich_dataframe, format_currency, format_percentage, format_currency_series
 
 # Handle refresh after successful operations
 if st.session_state.get('needs_refresh', False):
@@ -52,10 +52,11 @@ Use the sidebar to navigate between different views.
 
 # Check database connection
 try:
-    # Try to connect to the database
-    conn = get_db_connection(db_path)
-    df = get_all_listings(db_path, limit=1000)  # Increased limit to show more data
-    conn.close()
+    df = get_all_listings(db_path, limit=1000, columns=[  # Increased limit to show more data
+        'id', 'last_updated', 'db_updated_at', 'days_on_compass', 'address', 'city', 'price',
+        'status', 'beds', 'baths', 'sqft', 'price_per_sqft', 'mls_type', 'walk_score',
+        'estimated_rent', 'estimated_monthly_cashflow', 'rent_yield', 'tax_information', 'url'
+    ])
     
     if df.empty:
         st.warning("Database connected, but no data found. Use the Data Enrichment page to populate your database.")
@@ -106,11 +107,11 @@ try:
                 display_df['last_updated'] = display_df['last_updated'].dt.tz_localize('UTC').dt.tz_convert('America/Los_Angeles')
 
             if 'price' in display_df.columns:
-                display_df['price'] = display_df['price'].apply(lambda x: f"${x:,.0f}" if pd.notna(x) and isinstance(x, (int, float)) else x)
+                display_df['price'] = format_currency_series(display_df['price'], na_rep=None)
             if 'price_per_sqft' in display_df.columns:
-                display_df['price_per_sqft'] = display_df['price_per_sqft'].apply(lambda x: f"${x:,.0f}" if pd.notna(x) and isinstance(x, (int, float)) else x)
+                display_df['price_per_sqft'] = format_currency_series(display_df['price_per_sqft'], na_rep=None)
             if 'estimated_rent' in display_df.columns:
-                display_df['estimated_rent'] = display_df['estimated_rent'].apply(lambda x: f"${x:,.0f}" if pd.notna(x) and isinstance(x, (int, float)) else x)
+                display_df['estimated_rent'] = format_currency_series(display_df['estimated_rent'], na_rep=None)
             if 'rent_yield' in display_df.columns:
                 display_df['rent_yield'] = display_df['rent_yield'].apply(lambda x: x * 100 if pd.notna(x) and isinstance(x, (int, float)) else x)
             if 'walk_score' in display_df.columns:
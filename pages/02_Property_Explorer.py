@@ -2,14 +2,13 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import numpy as np
-from utils.database import get_db_connection, get_filtered_listings, get_all_listings, get_blacklisted_addresses, toggle_favorite, get_favorites
-from utils.data_processing import enrich_dataframe, format_currency, format_percentage
+from utils.database import shared_connection, get_filtered_listings, get_all_listings, get_blacklisted_addresses, batch_update, get_favorites
+from utils.data_processing import enrich_dataframe, format_currency, format_percentage, format_currency_series
 import io
 import pydeck as pdk
 import subprocess
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode, JsCode
 from pathlib import Path
-import sqlite3
 from datetime import datetime
 import sys
 import json
@@ -83,14 +82,13 @@ def show_history(address):
 def get_rental_history(listing_id):
     """Get rental history for a specific listing_id."""
     try:
-        conn = sqlite3.connect(db_path)
-        df_history = pd.read_sql_query("""
-            SELECT date, rent
-            FROM rental_history
-            WHERE listing_id = ?
-            ORDER BY date ASC
-        """, conn, params=(listing_id,))
-        conn.close()
+        with shared_connection(db_path) as conn:
+            df_history = pd.read_sql_query("""
+                SELECT date, rent
+                FROM rental_history
+                WHERE listing_id = ?
+                ORDER BY date ASC
+            """, conn, params=(listing_id,))
         # Ensure date is treated as datetime for plotting and resampling
         df_history['date'] = pd.to_datetime(df_history['date'])
         return df_history
@@ -101,14 +99,13 @@ def get_rental_history(listing_id):
 def get_listing_changes(listing_id):
     """Get change history for a specific listing_id."""
     try:
-        conn = sqlite3.connect(db_path)
-        df_changes = pd.read_sql_query("""
-            SELECT field_name, old_value, new_value, changed_at, source
-            FROM listing_changes
-            WHERE listing_id = ?
-            ORDER BY changed_at DESC
-        """, conn, params=(listing_id,))
-        conn.close()
+        with shared_connection(db_path) as conn:
+            df_changes = pd.read_sql_query("""
+                SELECT field_name, old_value, new_value, changed_at, source
+                FROM listing_changes
+                WHERE listing_id = ?
+                ORDER BY changed_at DESC
+            """, conn, params=(listing_id,))
         # Ensure changed_at is treated as datetime
         df_changes['changed_at'] = pd.to_datetime(df_changes['changed_at'])
         return df_changes
@@ -238,11 +235,11 @@ try:
                 display_df['created_at'] = pd.to_datetime(display_df['created_at'], errors='coerce')
             
             if 'price' in display_df.columns:
-                display_df['price'] = display_df['price'].apply(lambda x: f"${x:,.0f}" if pd.notna(x) and isinstance(x, (int, float)) else x)
+                display_df['price'] = format_currency_series(display_df['price'], na_rep=None)
             if 'price_per_sqft' in display_df.columns:
-                display_df['price_per_sqft'] = display_df['price_per_sqft'].apply(lambda x: f"${x:,.0f}" if pd.notna(x) and isinstance(x, (int, float)) else x)
+                display_df['price_per_sqft'] = format_currency_series(display_df['price_per_sqft'], na_rep=None)
             if 'estimated_rent' in display_df.columns:
-                display_df['estimated_rent'] = display_df['estimated_rent'].apply(lambda x: f"${x:,.0f}" if pd.notna(x) and isinstance(x, (int, float)) else x)
+                display_df['estimated_rent'] = format_currency_series(display_df['estimated_rent'], na_rep=None)
             if 'rent_yield' in display_df.columns:
                 # Convert to percentage value for NumberColumn (e.g., 0.075 -> 7.5)
                 display_df['rent_yield'] = display_df['rent_yield'].apply(lambda x: x * 100 if pd.notna(x) and isinstance(x, (int, float)) else x)
@@ -380,40 +377,24 @@ try:
                 
                 # Only process changes if there are any
                 if current_favorites != previous_favorites:
-                    for idx, row in edited_df.iterrows():
-                        if row['favorite'] != display_df.iloc[idx]['favorite']:
-                            listing_id_from_df = display_df.iloc[idx]['id']
-                            listing_id_for_db = int(listing_id_from_df)  # Explicit cast to Python int
-                            
-                            try:
-                                # Store the current state before attempting to change
-                                current_state = bool(row['favorite'])
-                                
-                                # Attempt to update the database
-                                success = toggle_favorite(db_path, listing_id_for_db, current_state)
-                                
-                                if success:
-                                    # Update was successful, force a refresh
-                                    st.session_state['needs_refresh'] = True
-                                    # Clear the property_table state to force a fresh load
-                                    if 'property_table' in st.session_state:
-                                        del st.session_state['property_table']
-                                    st.rerun()
-                                else:
-                                    # Update failed, reset the UI state
-                                    edited_df.at[idx, 'favorite'] = display_df.iloc[idx]['favorite']
-                                    st.error(f"Failed to update favorite status for {display_df.iloc[idx]['address']}")
-                                    # Force a refresh to ensure UI is in sync
-                                    st.session_state['needs_refresh'] = True
-                                    st.rerun()
-                            except Exception as e:
-                                # Handle any unexpected errors
-                                st.error(f"Error updating favorite: {str(e)}")
-                                # Reset the favorite state to match the database
-                                edited_df.at[idx, 'favorite'] = display_df.iloc[idx]['favorite']
-                                # Force a refresh to ensure UI is in sync
-                                st.session_state['needs_refresh'] = True
-                                st.rerun()
+                    changed = edited_df['favorite'].to_numpy() != display_df['favorite'].to_numpy()
+                    rows = [
+                        {'id': int(listing_id), 'favorite': int(bool(favorite))}
+                        for listing_id, favorite in zip(display_df['id'].to_numpy()[changed], edited_df['favorite'].to_numpy()[changed])
+                    ]
+                    try:
+                        # All the edits are written back in one transaction
+                        updated = batch_update(db_path, 'listings', rows, batch_size=None)
+                        if updated == 0:
+                            st.error("Failed to update favorite status")
+                    except Exception as e:
+                        # Handle any unexpected errors
+                        st.error(f"Error updating favorite: {str(e)}")
+                    # Force a refresh so the table matches the database
+                    st.session_state['needs_refresh'] = True
+                    if 'property_table' in st.session_state:
+                        del st.session_state['property_table']
+                    st.rerun()
 
             # Add a refresh button
             if st.button("Refresh Page to Show Updated Data"):
@@ -523,7 +504,7 @@ try:
                 # Format the display table
                 display_columns = ['address', 'price', 'beds', 'baths', 'sqft', 'Compass', 'WalkScore']
                 display_df = map_df[display_columns].copy()
-                display_df['price'] = display_df['price'].apply(lambda x: f"${x:,.0f}" if pd.notna(x) and isinstance(x, (int, float)) else x)
+                display_df['price'] = format_currency_series(display_df['price'], na_rep=None)
                 
                 st.write(
                     display_df.to_html(render_links=True, escape=False, index=False),
@@ -653,11 +634,17 @@ try:
             # Additional analysis
             if analysis_metric == "Price" and 'city' in df.columns and df['city'].notna().any():
                 # Box plot of price by city
-                city_counts = df['city'].value_counts()
+                cities = df['city']
+                if isinstance(cities.dtype, pd.CategoricalDtype):
+                    # city is categorical; drop cities with no rows left after filtering so they aren't charted
+                    cities = cities.cat.remove_unused_categories()
+                city_counts = cities.value_counts()
                 top_cities = city_counts[city_counts >= 3].index.tolist()
                 
                 if top_cities:
-                    city_df = df[df['city'].isin(top_cities)]
+                    city_df = df.assign(city=cities)[cities.isin(top_cities)]
+                    if isinstance(cities.dtype, pd.CategoricalDtype):
+                        city_df['city'] = city_df['city'].cat.remove_unused_categories()
                     
                     fig = px.box(
                         city_df, 
@@ -816,7 +803,7 @@ try:
                 
                 # Format the quarter start date
                 quarterly_history['Quarter'] = quarterly_history['date'].dt.to_period('Q').astype(str)
-                quarterly_history['Rent'] = quarterly_history['last_rent'].apply(lambda x: f"${x:,.0f}" if pd.notna(x) else "")
+                quarterly_history['Rent'] = format_currency_series(quarterly_history['last_rent'], na_rep="")
 
                 if not quarterly_history.empty:
                      st.dataframe(
@@ -859,11 +846,10 @@ try:
                 if manual_address.strip():
                     # First get the listing_id for the address
                     try:
-                        conn = sqlite3.connect(db_path)
-                        cursor = conn.cursor()
-                        cursor.execute("SELECT id FROM listings WHERE address = ?", (manual_address.strip(),))
-                        result = cursor.fetchone()
-                        conn.close()
+                        with shared_connection(db_path) as conn:
+                            result = conn.execute(
+                                "SELECT id FROM listings WHERE address = ?", (manual_address.strip(),)
+                            ).fetchone()
                         
                         if result:
                             listing_id = result[0]
@@ -898,7 +884,7 @@ try:
                                 st.subheader("Rental History")
                                 # Format the rental history for display
                                 rental_df['date'] = rental_df['date'].dt.strftime('%Y-%m-%d')
-                                rental_df['rent'] = rental_df['rent'].apply(lambda x: f"${x:,.0f}" if pd.notna(x) else "")
+                                rental_df['rent'] = format_currency_series(rental_df['rent'], na_rep="")
                                 st.dataframe(
                                     rental_df,
                                     column_config={
@@ -1117,7 +1103,6 @@ try:
             
             try:
                 # Get favorite properties using the same pattern as Data Enrichment
-                conn = get_db_connection(db_path)
                 favorites_df = get_favorites(db_path)
                 
                 # Debug: Show raw favorites DataFrame
@@ -1143,11 +1128,11 @@ try:
                     
                     # Format currency columns
                     if 'price' in display_favorites.columns:
-                        display_favorites['price'] = display_favorites['price'].apply(lambda x: f"${x:,.0f}" if pd.notna(x) and isinstance(x, (int, float)) else x)
+                        display_favorites['price'] = format_currency_series(display_favorites['price'], na_rep=None)
                     if 'estimated_rent' in display_favorites.columns:
-                        display_favorites['estimated_rent'] = display_favorites['estimated_rent'].apply(lambda x: f"${x:,.0f}" if pd.notna(x) and isinstance(x, (int, float)) else x)
+                        display_favorites['estimated_rent'] = format_currency_series(display_favorites['estimated_rent'], na_rep=None)
                     if 'estimated_monthly_cashflow' in display_favorites.columns:
-                        display_favorites['estimated_monthly_cashflow'] = display_favorites['estimated_monthly_cashflow'].apply(lambda x: f"${x:,.0f}" if pd.notna(x) and isinstance(x, (int, float)) else x)
+                        display_favorites['estimated_monthly_cashflow'] = format_currency_series(display_favorites['estimated_monthly_cashflow'], na_rep=None)
                     if 'rent_yield' in display_favorites.columns:
                         # Convert to percentage value (e.g., 0.075 -> 7.5) for NumberColumn formatting
                         display_favorites['rent_yield'] = display_favorites['rent_yield'].apply(lambda x: x * 100 if pd.notna(x) and isinstance(x, (int, float)) else x)
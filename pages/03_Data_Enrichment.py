@@ -4,17 +4,47 @@ import os
 import pandas as pd
 from pathlib import Path
 from utils.script_runner import (
+    run_script,
     run_gmail_parser, 
     run_compass_enrichment, 
     run_walkscore_enrichment,
     run_cashflow_enrichment,
-    get_script_progress
+    new_script_progress,
+    update_script_progress,
+    is_script_running
 )
-from utils.database import get_db_connection, get_all_listings, get_blacklisted_addresses
+from utils.database import get_all_listings, get_blacklisted_addresses
 from utils.data_processing import get_properties_needing_enrichment
 from utils.table_config import get_column_config, get_compass_enrichment_columns, get_walkscore_enrichment_columns
 from utils.table_styles import get_table_styles
 
+# Minimum seconds between runs of the blacklist expired script
+BLACKLIST_EXPIRED_DEBOUNCE_SECONDS = 2.0
+
+# Number of trailing characters of script output rendered inline
+SCRIPT_OUTPUT_TAIL_CHARS = 5000
+
+# Tabs the dashboard buttons can switch to
+SWITCHABLE_TABS = frozenset({"WalkScore Enrichment", "Compass Enrichment", "Cashflow Enrichment"})
+
+# Session state used by this page, installed once per session
+SESSION_DEFAULTS = {
+    'blacklist_expired_output': "",
+    'bl_exp_last_run': 0.0,
+}
+
+def _progress_callback(progress_bar, status_text):
+    """on_line callback that keeps a progress bar and status line current while a script runs."""
+    progress_info = new_script_progress()
+
+    def on_line(line):
+        processed = progress_info['processed']
+        update_script_progress(progress_info, line)
+        if progress_info['total'] > 0 and progress_info['processed'] != processed:
+            progress_bar.progress(min(progress_info['processed'] / progress_info['total'], 1.0))
+        status_text.text(progress_info['last_message'])
+    return on_line
+
 st.set_page_config(page_title="Data Enrichment", page_icon="🔄", layout="wide")
 st.title("Data Enrichment")
 
@@ -23,6 +53,11 @@ db_path = st.session_state.get('db_path', "")
 scripts_path = st.session_state.get('default_scripts_path', "../property-pipeline/scripts")
 config_path = st.session_state.get('default_config_path', "../property-pipeline/config")
 
+if not st.session_state.get('_enrichment_defaults_installed'):
+    for key, value in SESSION_DEFAULTS.items():
+        st.session_state.setdefault(key, value)
+    st.session_state['_enrichment_defaults_installed'] = True
+
 # Define tab names and determine the active one from query params
 tab_names = [
     "Enrichment Dashboard", 
@@ -43,7 +78,6 @@ with tab1:
     st.header("Enrichment Dashboard")
     
     try:
-        conn = get_db_connection(db_path)
         df = get_all_listings(db_path)
         
         if df.empty:
@@ -83,7 +117,7 @@ with tab1:
             col1, col2, col3, col4 = st.columns(4)
             
             with col1:
-                walkscore_missing = len(enrichment_needed['walkscore_missing'])
+                walkscore_missing = int(enrichment_needed['walkscore_missing'].sum())
                 st.metric("Need WalkScore Data", f"{walkscore_missing:,}")
                 
                 if walkscore_missing > 0:
@@ -91,7 +125,7 @@ with tab1:
                               on_click=lambda: st.session_state.update({"active_tab": "WalkScore Enrichment"}))
             
             with col2:
-                mls_missing = len(enrichment_needed['mls_missing'])
+                mls_missing = int(enrichment_needed['mls_missing'].sum())
                 st.metric("Need MLS Data", f"{mls_missing:,}")
                 
                 if mls_missing > 0:
@@ -99,7 +133,7 @@ with tab1:
                               on_click=lambda: st.session_state.update({"active_tab": "Compass Enrichment"}))
             
             with col3:
-                tax_missing = len(enrichment_needed['tax_missing'])
+                tax_missing = int(enrichment_needed['tax_missing'].sum())
                 st.metric("Need Tax Data", f"{tax_missing:,}")
                 
                 if tax_missing > 0:
@@ -107,7 +141,7 @@ with tab1:
                               on_click=lambda: st.session_state.update({"active_tab": "Compass Enrichment"}))
 
             with col4:
-                cashflow_missing_count = len(enrichment_needed.get('cashflow_missing', []))
+                cashflow_missing_count = int(enrichment_needed['cashflow_missing'].sum())
                 st.metric("Need Cashflow Data", f"{cashflow_missing_count:,}")
 
                 if cashflow_missing_count > 0:
@@ -159,16 +193,10 @@ with tab2:
                         script_path=gmail_script_path,
                         max_emails=max_emails, 
                         dry_run=dry_run, 
-                        config=config_file
+                        config=config_file,
+                        on_line=_progress_callback(progress_bar, status_text)
                     )
                     
-                    if result['stdout']:
-                        progress_info = get_script_progress(result['stdout'])
-                        if progress_info and progress_info['total'] > 0:
-                            progress = min(progress_info['processed'] / progress_info['total'], 1.0)
-                            progress_bar.progress(progress)
-                            status_text.text(progress_info['last_message'])
-                    
                     if result['returncode'] == 0:
                         st.success("Gmail Parser completed successfully")
                         # Add refresh after successful operation
@@ -205,7 +233,6 @@ with tab3:
     else:
         # Get all properties
         try:
-            conn = get_db_connection(db_path)
             df = get_all_listings(db_path)
             
             if df.empty:
@@ -274,13 +301,10 @@ with tab3:
                         else:
                             # Get properties that need enrichment
                             enrichment_needed = get_properties_needing_enrichment(df)
-                            properties_needing_enrichment = pd.concat([
-                                enrichment_needed['mls_missing'],
-                                enrichment_needed['tax_missing']
-                            ]).drop_duplicates(subset=['address'])
+                            needs_enrichment = enrichment_needed['mls_missing'] | enrichment_needed['tax_missing']
                             
                             # Take the first N properties that need enrichment
-                            addresses_to_process = properties_needing_enrichment['address'].head(limit).tolist()
+                            addresses_to_process = df.loc[needs_enrichment, 'address'].drop_duplicates().head(limit).tolist()
                             status_text.text(f"Processing {len(addresses_to_process)} properties that need enrichment...")
                         
                         # Run the script for each address
@@ -351,7 +375,6 @@ with tab4:
         
         # Get all properties
         try:
-            conn = get_db_connection(db_path)
             df = get_all_listings(db_path)
             
             if df.empty:
@@ -406,14 +429,14 @@ with tab4:
                         else:
                             # Get properties that need enrichment
                             enrichment_needed = get_properties_needing_enrichment(df)
-                            properties_needing_enrichment = pd.concat([
-                                enrichment_needed['walkscore_missing'],
-                                enrichment_needed['transit_missing'],
-                                enrichment_needed['bike_missing']
-                            ]).drop_duplicates(subset=['address'])
+                            needs_enrichment = (
+                                enrichment_needed['walkscore_missing']
+                                | enrichment_needed['transit_missing']
+                                | enrichment_needed['bike_missing']
+                            )
                             
                             # Take the first N properties that need enrichment
-                            addresses_to_process = properties_needing_enrichment['address'].head(limit).tolist()
+                            addresses_to_process = df.loc[needs_enrichment, 'address'].drop_duplicates().head(limit).tolist()
                             status_text.text(f"Processing {len(addresses_to_process)} properties that need enrichment...")
                         
                         # Run the script for each address
@@ -521,16 +544,10 @@ with tab5:
                         limit=limit, 
                         dry_run=dry_run,
                         force_update=force_update,
-                        address=address if address else None
+                        address=address if address else None,
+                        on_line=_progress_callback(progress_bar, status_text)
                     )
                     
-                    if result['stdout']:
-                        progress_info = get_script_progress(result['stdout'])
-                        if progress_info and progress_info['total'] > 0:
-                            progress = min(progress_info['processed'] / progress_info['total'], 1.0)
-                            progress_bar.progress(progress)
-                            status_text.text(progress_info['last_message'])
-                    
                     if result['returncode'] == 0:
                         st.success("Cashflow Enrichment completed successfully")
                         # Add refresh after successful operation
@@ -558,7 +575,8 @@ with tab6:
     # Show current blacklist
     st.subheader("Current Blacklist")
     blacklist_df = get_blacklisted_addresses(db_path)
-    if not blacklist_df.empty:
+    n_black = len(blacklist_df)
+    if n_black > 0:
         st.dataframe(blacklist_df, use_container_width=True)
     else:
         st.info("No addresses are currently blacklisted.")
@@ -584,7 +602,7 @@ with tab6:
     
     # Remove from blacklist
     st.subheader("Remove from Blacklist")
-    if not blacklist_df.empty:
+    if n_black > 0:
         address_to_remove = st.selectbox(
             "Select address to remove from blacklist",
             blacklist_df['address'].tolist()
@@ -602,63 +620,72 @@ with tab6:
     st.subheader("Clean Up Expired Blacklist Entries")
     st.write("Run the script to automatically remove expired addresses from the blacklist based on criteria defined in the script.")
 
-    # Initialize session state for script output
-    if 'blacklist_expired_output' not in st.session_state:
-        st.session_state['blacklist_expired_output'] = ""
-
     # Add Dry Run checkbox
     run_expired_dry_run = st.checkbox("Dry Run (do not actually modify the database)", key="run_expired_dry_run_checkbox")
 
     if st.button("Run Blacklist Expired Script", key="run_blacklist_expired_script_button"):
-         # Define the path to the blacklist_expired_address.py script
+        # Define the path to the blacklist_expired_address.py script
         blacklist_expired_script_path = Path(scripts_path) / "blacklist_address_expired.py"
 
-        if not blacklist_expired_script_path.exists():
-            st.session_state['blacklist_expired_output'] = f"Error: Blacklist expired script not found at {blacklist_expired_script_path}"
+        # Ignore repeat presses inside the debounce window, or while another
+        # run is still in flight, so a double-click can't start a second run
+        # against the database
+        now = time.monotonic()
+        if (now - st.session_state['bl_exp_last_run'] < BLACKLIST_EXPIRED_DEBOUNCE_SECONDS
+                or is_script_running(blacklist_expired_script_path)):
+            st.warning("Blacklist expired script is already running.")
         else:
+            st.session_state['bl_exp_last_run'] = now
+
             try:
-                # Execute the script
-                cmd = [sys.executable, str(blacklist_expired_script_path)]
-                if run_expired_dry_run:
-                    cmd.append("--dry-run")
-
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=60 # Give it a bit more time
-                )
-                if result.returncode == 0:
-                    st.session_state['blacklist_expired_output'] = result.stdout
-                    st.success("Blacklist expired script executed successfully.")
+                if not blacklist_expired_script_path.exists():
+                    st.session_state['blacklist_expired_output'] = f"Error: Blacklist expired script not found at {blacklist_expired_script_path}"
                 else:
-                    st.session_state['blacklist_expired_output'] = f"Script error (exit {result.returncode}):\n{result.stderr}\n{result.stdout}"
-                    st.error("Error executing blacklist expired script.")
-            except Exception as e:
-                st.session_state['blacklist_expired_output'] = f"Error running script: {e}"
-                st.error(f"Error running script: {e}")
-
-    # Display script output if available
-    if st.session_state['blacklist_expired_output']:
-         st.markdown("#### Script Output:")
-         st.code(st.session_state['blacklist_expired_output'])
+                    try:
+                        result = run_script(
+                            blacklist_expired_script_path,
+                            ["--dry-run"] if run_expired_dry_run else None,
+                            timeout=60 # Give it a bit more time
+                        )
+
+                        if result['returncode'] == 0:
+                            st.session_state['blacklist_expired_output'] = result['stdout']
+                            st.success("Blacklist expired script executed successfully.")
+                        else:
+                            st.session_state['blacklist_expired_output'] = f"Script error (exit {result['returncode']}):\n{result['stderr']}\n{result['stdout']}"
+                            st.error("Error executing blacklist expired script.")
+                    except Exception as e:
+                        st.session_state['blacklist_expired_output'] = f"Error running script: {e}"
+                        st.error(f"Error running script: {e}")
+            finally:
+                # Restart the window when the run ends, even if a rerun
+                # interrupts it, so a click queued meanwhile is dropped too
+                st.session_state['bl_exp_last_run'] = time.monotonic()
+
+    # Display script output if available. Only the tail is rendered (without
+    # syntax highlighting) so a chatty dry run doesn't get re-sent on every rerun;
+    # the complete log stays available as a download.
+    blacklist_expired_output = st.session_state['blacklist_expired_output']
+    if blacklist_expired_output:
+        st.markdown("#### Script Output:")
+        if len(blacklist_expired_output) > SCRIPT_OUTPUT_TAIL_CHARS:
+            st.caption(f"Showing the last {SCRIPT_OUTPUT_TAIL_CHARS:,} characters. Download the full log below.")
+            st.code(blacklist_expired_output[-SCRIPT_OUTPUT_TAIL_CHARS:], language=None)
+        else:
+            st.code(blacklist_expired_output, language=None)
+        st.download_button(
+            "Full log",
+            blacklist_expired_output,
+            file_name="blacklist_expired_output.txt",
+            mime="text/plain",
+            key="blacklist_expired_output_download"
+        )
 
 # Handle tab switching from dashboard buttons
-if 'active_tab' in st.session_state:
-    active_tab = st.session_state.pop('active_tab', None)
-    if active_tab:
-        tab_to_switch_to = None
-        if active_tab == "WalkScore Enrichment":
-            tab_to_switch_to = "WalkScore Enrichment"
-        elif active_tab == "Compass Enrichment":
-            tab_to_switch_to = "Compass Enrichment"
-        elif active_tab == "Cashflow Enrichment":
-            tab_to_switch_to = "Cashflow Enrichment"
-        
-        if tab_to_switch_to:
-            st.query_params["tab"] = tab_to_switch_to
-            st.session_state['needs_refresh'] = True
-            st.rerun()
+active_tab = st.session_state.pop('active_tab', None)
+if active_tab in SWITCHABLE_TABS:
+    st.query_params["tab"] = active_tab
+    st.rerun()
 
 # Handle refresh after successful operations
 if st.session_state.get('needs_refresh', False):
@@ -0,0 +1,84 @@
+import sqlite3
+
+import pytest
+
+# Schema of the pipeline's listings table
+SCHEMA_COLUMNS = [
+    "id", "address", "city", "state", "zip", "price", "beds", "baths", "sqft",
+    "price_per_sqft", "url", "from_collection", "source", "imported_at",
+    "estimated_rent", "rent_yield", "mls_number", "mls_type", "tax_information",
+    "days_on_compass", "last_updated", "favorite", "year_built", "lot_size",
+    "hoa_fee", "parking", "heating", "cooling", "style", "construction",
+    "days_on_market", "status", "agent_name", "agent_phone", "agent_email",
+    "schools_json", "price_history_json", "walk_score", "transit_score", "bike_score",
+    "walkscore_shorturl", "compass_shorturl", "latitude", "longitude",
+    "created_at", "estimated_monthly_cashflow", "db_updated_at",
+]
+TEXT_COLUMNS = {
+    "address", "city", "state", "zip", "url", "from_collection", "source", "imported_at", "mls_number",
+    "mls_type", "tax_information", "last_updated", "lot_size", "parking", "heating", "cooling", "style",
+    "construction", "status", "agent_name", "agent_phone", "agent_email", "walkscore_shorturl",
+    "compass_shorturl", "created_at", "db_updated_at", "schools_json", "price_history_json",
+}
+INTEGER_COLUMNS = {"days_on_compass", "days_on_market"}
+
+CITIES = ["Denver", "Boulder", "Aurora", None]
+MLS_TYPES = ["Condo", "SFH", None]
+
+def _column_type(name):
+    if name == "id":
+        return "INTEGER PRIMARY KEY"
+    if name == "favorite":
+        return "INTEGER DEFAULT 0"
+    if name in TEXT_COLUMNS:
+        return "TEXT"
+    if name in INTEGER_COLUMNS:
+        return "INTEGER"
+    return "REAL"
+
+def listing_row(i):
+    """Deterministic test listing number i."""
+    price = None if i % 10 == 0 else 100000 * (i % 25 + 1)
+    return {
+        "id": i,
+        "address": f"{i} Main St",
+        "city": CITIES[i % len(CITIES)],
+        "state": "CO",
+        "zip": str(80200 + i % 5),
+        "price": price,
+        "beds": float(i % 4 + 1),
+        "baths": 1.5,
+        "sqft": None if i % 7 == 0 else 800.0 + 10 * i,
+        "estimated_rent": None if i % 3 == 0 else 2000.0 + i,
+        "mls_type": MLS_TYPES[i % len(MLS_TYPES)],
+        "walk_score": None if i % 6 == 0 else float(i % 100),
+        "transit_score": float(i % 50),
+        "bike_score": None,
+        "favorite": int(i % 9 == 0),
+        "last_updated": f"2024-01-{i % 28 + 1:02d}",
+        "schools_json": "[]",
+        "price_history_json": "[]",
+    }
+
+def make_db(path, n=40):
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE listings ({', '.join(f'{col} {_column_type(col)}' for col in SCHEMA_COLUMNS)})")
+    conn.execute(
+        "CREATE TABLE address_blacklist (id INTEGER PRIMARY KEY, address TEXT UNIQUE, reason TEXT, "
+        "blacklisted_at TEXT DEFAULT CURRENT_TIMESTAMP)"
+    )
+    for i in range(1, n + 1):
+        row = listing_row(i)
+        conn.execute(
+            f"INSERT INTO listings ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+            list(row.values()),
+        )
+    conn.execute("INSERT INTO address_blacklist (address, reason) VALUES ('5 MAIN ST', 'test')")
+    conn.commit()
+    conn.close()
+    return str(path)
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.setattr("utils.database.LISTINGS_CACHE_DIR", tmp_path / "cache")
+    return make_db(tmp_path / "listings.db")
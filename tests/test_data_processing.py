@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.data_processing import (
+    categorize_price,
+    categorize_rent_yield,
+    categorize_walkscore,
+    enrich_dataframe,
+)
+
+def _nullable_frames():
+    """The same listings with missing values as pd.NA: object, masked and (when installed) Arrow-backed columns."""
+    values = {
+        'price': [400000.0, None, 3000000.0, 0.0],
+        'sqft': [1000.0, 1500.0, None, 800.0],
+        'estimated_rent': [None, 2500.0, 9000.0, None],
+        'rent_yield': [None, None, 0.036, 0.08],
+        'walk_score': [45.0, None, 90.0, 70.0],
+    }
+    frames = {
+        'object': pd.DataFrame({col: pd.Series([pd.NA if v is None else v for v in vals], dtype=object) for col, vals in values.items()}),
+        'Float64': pd.DataFrame({col: pd.array(vals, dtype='Float64') for col, vals in values.items()}),
+    }
+    try:
+        import pyarrow  # noqa: F401
+        frames['arrow'] = pd.DataFrame({col: pd.array(vals, dtype='float64[pyarrow]') for col, vals in values.items()})
+    except ImportError:
+        pass
+    expected = pd.DataFrame({col: pd.array(vals, dtype='float64') for col, vals in values.items()})
+    return frames, expected
+
+@pytest.mark.parametrize("kind", ['object', 'Float64', 'arrow'])
+def test_enrich_dataframe_accepts_missing_values(kind):
+    frames, expected = _nullable_frames()
+    if kind not in frames:
+        pytest.skip("pyarrow not installed")
+    result = enrich_dataframe(frames[kind])
+    expected = enrich_dataframe(expected)
+    for col in ('price_per_sqft', 'estimated_rent', 'rent_yield'):
+        np.testing.assert_allclose(result[col].to_numpy(dtype=np.float64), expected[col].to_numpy(), equal_nan=True)
+
+@pytest.mark.parametrize("kind", ['object', 'Float64', 'arrow'])
+def test_categorize_accepts_missing_values(kind):
+    frames, expected = _nullable_frames()
+    if kind not in frames:
+        pytest.skip("pyarrow not installed")
+    result = categorize_price(categorize_rent_yield(categorize_walkscore(frames[kind])))
+    assert result['walk_score_category'].tolist() == ['Car-Dependent', 'Unknown', "Walker's Paradise", 'Very Walkable']
+    assert result['yield_category'].tolist() == ['Unknown', 'Unknown', 'Low', 'Good']
+    assert result['price_category'].astype(object).tolist() == ['$250K-$500K', np.nan, '$2M+', np.nan]
@@ -0,0 +1,220 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+import utils.database as database
+from utils.database import get_all_listings, get_filtered_listings
+
+
+@pytest.mark.skipif(database.apsw is None, reason="apsw not installed")
+@pytest.mark.parametrize("chunksize", [None, 7])
+def test_apsw_and_sqlite3_reads_match(db_path, monkeypatch, chunksize):
+    # limit skips the Parquet snapshot so both reads hit the database
+    via_apsw = get_all_listings(db_path, limit=1000, chunksize=chunksize)
+    filtered_apsw = get_filtered_listings(db_path, categorize=True, chunksize=chunksize)
+    monkeypatch.setattr(database, "USE_APSW", False)
+    via_sqlite3 = get_all_listings(db_path, limit=1000, chunksize=chunksize)
+    filtered_sqlite3 = get_filtered_listings(db_path, categorize=True, chunksize=chunksize)
+
+    pd.testing.assert_frame_equal(via_apsw, via_sqlite3)
+    pd.testing.assert_frame_equal(filtered_apsw, filtered_sqlite3)
+    assert via_apsw["price"].dtype == "float64"
+    assert via_apsw["favorite"].dtype == "int64"
+    assert via_apsw["city"].dtype == "category"
+
+@pytest.mark.skipif(database.apsw is None, reason="apsw not installed")
+def test_apsw_connection_is_reused_and_sees_writes(db_path):
+    conn = database._get_apsw_conn(db_path)
+    assert database._get_apsw_conn(db_path) is conn
+
+    database._get_conn(db_path).execute("UPDATE listings SET price = 1 WHERE id = 1")
+    assert get_filtered_listings(db_path, {"id": 1})["price"].tolist() == [1.0]
+
+def test_empty_result_keeps_columns(db_path):
+    df = get_filtered_listings(db_path, {"city": "Nowhere"})
+    assert df.empty
+    assert list(df.columns) == database.LISTING_COLUMNS
+
+@pytest.mark.skipif(database.pq is None, reason="pyarrow not installed")
+def test_listings_snapshot_is_private_and_reused(db_path, monkeypatch):
+    first = get_all_listings(db_path)
+    cache_dir = database.LISTINGS_CACHE_DIR
+    assert cache_dir.stat().st_mode & 0o777 == 0o700
+    assert len(list(cache_dir.glob("*.parquet"))) == 1
+
+    # The first snapshot is keyed on the version after the connection's setup, so it serves the next read
+    monkeypatch.setattr(database, "_frame_from_rows", lambda *args, **kwargs: pytest.fail("read the database"))
+    pd.testing.assert_frame_equal(get_all_listings(db_path), first)
+
+@pytest.mark.skipif(database.pq is None, reason="pyarrow not installed")
+def test_listings_cache_dir_is_made_private(db_path):
+    database.LISTINGS_CACHE_DIR.mkdir(mode=0o755)
+    database.LISTINGS_CACHE_DIR.chmod(0o755)
+    get_all_listings(db_path)
+    assert database.LISTINGS_CACHE_DIR.stat().st_mode & 0o777 == 0o700
+
+def test_summary_stats_cached_per_database_version(db_path, monkeypatch):
+    calls = []
+    compute = database._compute_summary_stats
+    monkeypatch.setattr(database, "_compute_summary_stats", lambda path: calls.append(path) or compute(path))
+
+    first = database.get_summary_stats(db_path)
+    database.get_summary_stats(db_path)
+    assert len(calls) == 1
+
+    database._get_conn(db_path).execute("DELETE FROM listings WHERE id = 2")
+    assert database.get_summary_stats(db_path)["total_count"] == first["total_count"] - 1
+    assert len(calls) == 2
+
+@pytest.mark.parametrize("chunksize", [None, 7])
+def test_fast_read_matches_read_sql_query(db_path, chunksize):
+    conn = database._get_conn(db_path)
+    query = "SELECT id, address, city, price, walk_score, favorite FROM listings WHERE price > ? ORDER BY id"
+    pd.testing.assert_frame_equal(
+        database._fast_read(conn, query, (0,), chunksize=chunksize),
+        pd.read_sql_query(query, conn, params=(0,)),
+    )
+
+def test_connection_is_shared_across_threads(db_path):
+    conn = database._get_conn(db_path)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        conns = list(pool.map(database._get_conn, [db_path] * 4))
+        counts = list(pool.map(lambda _: database.get_summary_stats(db_path)["total_count"], range(8)))
+    assert all(other is conn for other in conns)
+    assert counts == [40] * 8
+
+def test_build_filter_shape():
+    shape, params = database.build_filter_shape({
+        "price": (100000, None),
+        "sqft": (None, 2000),
+        "walk_score": ("IS NOT NULL",),
+        "mls_type": "Condo",
+    })
+    assert shape == (("price", ">="), ("sqft", "<="), ("walk_score", "IS NOT NULL"), ("mls_type", "="))
+    assert params == [100000, 2000, "Condo"]
+    with pytest.raises(ValueError):
+        database.build_filter_shape({"price; DROP TABLE listings": 1})
+
+def test_build_order_shape():
+    assert database.build_order_shape("-price") == (("price", "DESC"),)
+    assert database.build_order_shape(["city", "-price"], paged=True) == (("city", "ASC"), ("price", "DESC"), ("id", "ASC"))
+    assert database.build_order_shape("-id", paged=True) == (("id", "DESC"),)
+    assert database.build_order_shape(None) == ()
+    with pytest.raises(ValueError):
+        database.build_order_shape("price DESC")
+
+def test_filtered_listings_sql_is_cached_per_shape():
+    shape = (("city", "="), ("price", ">="))
+    query = database._filtered_listings_sql(shape, False, (("price", "DESC"),), True)
+    assert database._filtered_listings_sql(shape, False, (("price", "DESC"),), True) is query
+    assert 'AND "city" = ? AND "price" >= ?' in query
+    assert query.rstrip().endswith('ORDER BY "price" DESC LIMIT ? OFFSET ?')
+
+def test_filtered_listings_filter_on_category_columns(db_path):
+    df = get_filtered_listings(db_path, {"price_category": "$250K-$500K"}, categorize=True)
+    assert not df.empty
+    assert (df["price_category"] == "$250K-$500K").all()
+    assert df["price"].between(250000, 500000, inclusive="right").all()
+
+def test_filtered_listings_leave_out_blacklisted_addresses(db_path):
+    # The blacklist holds '5 MAIN ST'; the listing is '5 Main St'
+    ids = get_filtered_listings(db_path)["id"].tolist()
+    assert 5 not in ids
+    assert len(ids) == 39
+    plan = database._get_conn(db_path).execute(
+        "EXPLAIN QUERY PLAN SELECT 1 FROM address_blacklist b WHERE b.address = ? COLLATE NOCASE", ("x",)
+    ).fetchall()
+    assert "idx_blacklist_address_nocase" in str(plan)
+
+def test_city_price_reads_use_the_covering_index(db_path):
+    plan = database._get_conn(db_path).execute(
+        "EXPLAIN QUERY PLAN SELECT city, COUNT(*), AVG(price) FROM listings WHERE city = ? AND price >= ? GROUP BY city",
+        ("Denver", 100000),
+    ).fetchall()
+    assert "COVERING INDEX idx_listings_city_price" in str(plan)
+
+def test_filtered_listings_match_pandas_filtering(db_path):
+    everything = get_all_listings(db_path, limit=1000)
+    filtered = get_filtered_listings(db_path, {"city": "Denver", "price": (300000, 2000000)}, order_by="id")
+    expected = everything[
+        (everything["city"] == "Denver")
+        & everything["price"].between(300000, 2000000)
+        & (everything["address"].str.upper() != "5 MAIN ST")
+    ].reset_index(drop=True)
+    pd.testing.assert_frame_equal(filtered, expected, check_categorical=False)
+
+def test_filtered_listings_pages_cover_every_row_once(db_path):
+    everything = get_filtered_listings(db_path, order_by=["-price", "city"])
+    pages = [
+        get_filtered_listings(db_path, order_by=["-price", "city"], limit=7, offset=offset)
+        for offset in range(0, 42, 7)
+    ]
+    ids = [listing_id for page in pages for listing_id in page["id"]]
+    assert sorted(ids) == sorted(everything["id"])
+    assert len(ids) == len(set(ids))
+    # Prices are non-increasing across page boundaries, with NULL prices last as SQLite sorts them
+    prices = pd.concat([page["price"] for page in pages], ignore_index=True)
+    assert prices.dropna().is_monotonic_decreasing
+    assert prices.iloc[-prices.isna().sum():].isna().all()
+
+def test_blacklist_lookups_ignore_case(db_path):
+    assert database.is_address_blacklisted(db_path, "5 main st")
+    assert not database.is_address_blacklisted(db_path, "6 Main St")
+    assert database.remove_from_blacklist(db_path, "5 Main St")
+    assert not database.is_address_blacklisted(db_path, "5 MAIN ST")
+
+def test_detail_columns_only_when_asked_for(db_path):
+    assert not set(database.DETAIL_COLUMNS) & set(get_all_listings(db_path).columns)
+    details = get_all_listings(db_path, columns=["id"] + database.DETAIL_COLUMNS)
+    assert list(details.columns) == ["id"] + database.DETAIL_COLUMNS
+    assert details["schools_json"].eq("[]").all()
+
+def test_filtered_listings_categories_match_data_processing(db_path):
+    from utils.data_processing import categorize_price, categorize_rent_yield, categorize_walkscore
+
+    df = get_filtered_listings(db_path, categorize=True)
+    expected = categorize_price(categorize_rent_yield(categorize_walkscore(df.drop(
+        columns=["price_category", "walk_score_category", "yield_category"]
+    ))))
+    for col in ("price_category", "walk_score_category", "yield_category"):
+        assert df[col].astype(object).tolist() == expected[col].astype(object).tolist()
+    assert df["price_category"].cat.ordered
+
+    selected = get_all_listings(db_path, columns=["id", "price_category"])
+    assert selected["price_category"].cat.ordered
+    # Computed in the query; the pipeline's table is left alone
+    schema = {row[1] for row in database._get_conn(db_path).execute("PRAGMA table_xinfo(listings)")}
+    assert "price_category" not in schema
+
+def test_batch_update_writes_rows_in_batches(db_path):
+    conn = database._get_conn(db_path)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    rows = [{"id": i, "favorite": 1} for i in range(1, 6)] + [{"id": 6, "price": 5.0, "favorite": 0}]
+    try:
+        assert database.batch_update(db_path, "listings", rows, batch_size=2) == 6
+    finally:
+        conn.set_trace_callback(None)
+
+    # Five rows setting favorite in batches of two, and one row setting price and favorite
+    assert statements.count("BEGIN IMMEDIATE") == 4
+    assert statements.count("COMMIT") == 4
+    values = dict(conn.execute("SELECT id, favorite FROM listings WHERE id <= 6").fetchall())
+    assert values == {1: 1, 2: 1, 3: 1, 4: 1, 5: 1, 6: 0}
+    assert conn.execute("SELECT price FROM listings WHERE id = 6").fetchone() == (5.0,)
+
+def test_batch_update_rejects_unknown_names(db_path):
+    with pytest.raises(ValueError):
+        database.batch_update(db_path, "no_such_table", [{"id": 1, "favorite": 1}])
+    with pytest.raises(ValueError):
+        database.batch_update(db_path, "listings", [{"id": 1, "favorite; DROP TABLE listings": 1}])
+    assert database._get_conn(db_path).execute("SELECT COUNT(*) FROM listings").fetchone()[0] == 40
+
+def test_batch_update_rolls_back_a_failed_batch(db_path):
+    conn = database._get_conn(db_path)
+    conn.execute("CREATE TRIGGER reject AFTER UPDATE ON listings WHEN NEW.id = 2 BEGIN SELECT RAISE(ABORT, 'no'); END")
+    with pytest.raises(Exception):
+        database.batch_update(db_path, "listings", [{"id": 1, "favorite": 1}, {"id": 2, "favorite": 1}])
+    assert conn.execute("SELECT favorite FROM listings WHERE id = 1").fetchone() == (0,)
+    assert not conn.in_transaction
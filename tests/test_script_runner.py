@@ -0,0 +1,153 @@
+import json
+import os
+import subprocess
+import textwrap
+import time
+
+import pytest
+
+import utils.script_runner as script_runner
+
+# Prints two lines, then writes a marker file once it gets past the second, so a test can tell it wasn't killed
+LINES_SCRIPT = """
+import sys
+import time
+
+print("first")
+time.sleep(float(sys.argv[2]))
+print("second")
+open(sys.argv[1], "w").close()
+"""
+
+class FakeRerun(BaseException):
+    """Stands in for Streamlit's RerunException, which derives from BaseException."""
+
+@pytest.fixture
+def lines_script(tmp_path):
+    path = tmp_path / "lines.py"
+    path.write_text(textwrap.dedent(LINES_SCRIPT))
+    return str(path)
+
+def _wait_for_exit(script_path, timeout=10):
+    deadline = time.monotonic() + timeout
+    while script_runner.is_script_running(script_path):
+        assert time.monotonic() < deadline, "script still running"
+        time.sleep(0.05)
+
+def test_on_line_gets_each_line(lines_script, tmp_path):
+    lines = []
+    result = script_runner.run_script(lines_script, [str(tmp_path / "done"), "0"], on_line=lines.append)
+    assert lines == ["first", "second"]
+    assert result == {'returncode': 0, 'stdout': "first\nsecond\n", 'stderr': ""}
+
+def test_rerun_from_on_line_leaves_the_child_running(lines_script, tmp_path):
+    marker = tmp_path / "done"
+
+    def on_line(line):
+        raise FakeRerun()
+
+    with pytest.raises(FakeRerun):
+        script_runner.run_script(lines_script, [str(marker), "0.5"], timeout=30, on_line=on_line)
+    assert script_runner.is_script_running(lines_script)
+
+    _wait_for_exit(lines_script)
+    assert marker.exists()
+
+def test_error_from_on_line_kills_the_child(lines_script, tmp_path):
+    marker = tmp_path / "done"
+
+    def on_line(line):
+        raise ValueError(line)
+
+    with pytest.raises(ValueError):
+        script_runner.run_script(lines_script, [str(marker), "0.5"], on_line=on_line)
+    assert not script_runner.is_script_running(lines_script)
+    time.sleep(1)
+    assert not marker.exists()
+
+def test_streamed_run_times_out(lines_script, tmp_path):
+    with pytest.raises(subprocess.TimeoutExpired):
+        script_runner.run_script(lines_script, [str(tmp_path / "done"), "30"], timeout=0.5, on_line=lambda line: None)
+    assert not script_runner.is_script_running(lines_script)
+
+ENRICH_OUTPUT = """
+Found 3 listings to enrich
+Processing [1/3] 1 MAIN ST
+✅ Successfully enriched 1 MAIN ST
+Processing [2/3] 2 MAIN ST
+❌ Error: timeout
+Processing 3/3 3 MAIN ST
+Failed to fetch 3 MAIN ST ❌ Error
+"""
+
+def test_get_script_progress():
+    assert script_runner.get_script_progress("") is None
+    assert script_runner.get_script_progress(ENRICH_OUTPUT) == {
+        'total': 3,
+        'processed': 3,
+        'success': 1,
+        'failed': 2,
+        'last_message': 'Failed to fetch 3 MAIN ST ❌ Error',
+    }
+
+def test_progress_markers_inside_processing_line():
+    progress = script_runner.get_script_progress("Processing Error ✅ [4/9]")
+    assert (progress['processed'], progress['success'], progress['failed']) == (4, 1, 1)
+
+def test_update_script_progress_matches_full_parse():
+    progress = script_runner.new_script_progress()
+    for line in ENRICH_OUTPUT.splitlines():
+        script_runner.update_script_progress(progress, line)
+    assert progress == script_runner.get_script_progress(ENRICH_OUTPUT)
+
+ECHO_SCRIPT = """
+import argparse
+import json
+import sys
+
+def main():
+    parser = argparse.ArgumentParser()
+{options}
+    args, rest = parser.parse_known_args()
+    stdin = sys.stdin.read() if "--json-stdin" in sys.argv else ''
+    print(json.dumps({{'argv': sys.argv[1:], 'stdin': stdin}}))
+
+if __name__ == "__main__":
+    main()
+"""
+
+def _echo_script(tmp_path, options):
+    path = tmp_path / "echo.py"
+    path.write_text(textwrap.dedent(ECHO_SCRIPT).format(options=textwrap.indent(options, "    ")))
+    return str(path)
+
+def _mtime(path):
+    return os.stat(path).st_mtime
+
+def test_payload_args():
+    assert script_runner._payload_args({
+        'max_emails': 10,
+        'dry_run': True,
+        'force_update': False,
+        'config': None,
+        'rate': 6.5,
+    }) == ["--max-emails", "10", "--dry-run", "--rate", "6.5"]
+
+def test_json_stdin_needs_a_declared_option(tmp_path):
+    mentioned = _echo_script(tmp_path, '# no --json-stdin here\nparser.add_argument("--limit", help="unlike --json-stdin")')
+    assert not script_runner._accepts_json_stdin(mentioned, _mtime(mentioned))
+
+    declared = tmp_path / "declared.py"
+    declared.write_text('import argparse\nparser = argparse.ArgumentParser()\nparser.add_argument("--json-stdin", action="store_true")\n')
+    assert script_runner._accepts_json_stdin(str(declared), _mtime(declared))
+
+def test_run_with_options_passes_flags_or_json(tmp_path):
+    flags = _echo_script(tmp_path, 'parser.add_argument("--limit")  # --json-stdin is not supported')
+    result = json.loads(script_runner._run_with_options(flags, {'limit': 5, 'dry_run': True, 'address': None})['stdout'])
+    assert result == {'argv': ["--limit", "5", "--dry-run"], 'stdin': ''}
+
+    script_runner._accepts_json_stdin.cache_clear()
+    with_json = _echo_script(tmp_path, 'parser.add_argument("--json-stdin", action="store_true")')
+    result = json.loads(script_runner._run_with_options(with_json, {'limit': 5, 'dry_run': True, 'address': None})['stdout'])
+    assert result['argv'] == ["--json-stdin"]
+    assert json.loads(result['stdin']) == {'limit': 5, 'dry_run': True}
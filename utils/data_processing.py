@@ -15,45 +15,48 @@ def calculate_rent_yield(df):
         df.loc[mask, 'rent_yield'] = (df.loc[mask, 'estimated_rent'] * 12) / df.loc[mask, 'price']
     return df
 
+def _bucket_codes(values, edges, right=False):
+    """Bucket index of each value by edges, with -1 for NaN."""
+    values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    # With a handful of sorted edges, counting the thresholds each value passes beats a binary search
+    codes = np.zeros(len(values), dtype=np.int8)
+    for edge in edges:
+        codes += (values > edge) if right else (values >= edge)
+    codes[np.isnan(values)] = -1
+    return codes
+
 def categorize_walkscore(df):
     """Add a categorical column for WalkScore ranges."""
     if 'walk_score' in df.columns:
-        conditions = [
-            (df['walk_score'] < 25),
-            (df['walk_score'] >= 25) & (df['walk_score'] < 50),
-            (df['walk_score'] >= 50) & (df['walk_score'] < 70),
-            (df['walk_score'] >= 70) & (df['walk_score'] < 90),
-            (df['walk_score'] >= 90)
-        ]
-        choices = ['Car-Dependent', 'Car-Dependent', 'Somewhat Walkable', 'Very Walkable', 'Walker\'s Paradise']
-        df['walk_score_category'] = np.select(conditions, choices, default='Unknown')
+        edges = np.array([50, 70, 90], dtype=np.float64)
+        choices = ['Car-Dependent', 'Somewhat Walkable', 'Very Walkable', 'Walker\'s Paradise', 'Unknown']
+        codes = _bucket_codes(df['walk_score'], edges)
+        df['walk_score_category'] = pd.Categorical.from_codes(np.where(codes < 0, len(edges) + 1, codes), categories=choices)
     return df
 
 def categorize_rent_yield(df):
     """Add a categorical column for rent yield ranges."""
     if 'rent_yield' in df.columns:
-        conditions = [
-            (df['rent_yield'] < 0.03),
-            (df['rent_yield'] >= 0.03) & (df['rent_yield'] < 0.05),
-            (df['rent_yield'] >= 0.05) & (df['rent_yield'] < 0.07),
-            (df['rent_yield'] >= 0.07) & (df['rent_yield'] < 0.1),
-            (df['rent_yield'] >= 0.1)
-        ]
-        choices = ['Very Low', 'Low', 'Average', 'Good', 'Excellent']
-        df['yield_category'] = np.select(conditions, choices, default='Unknown')
+        edges = np.array([0.03, 0.05, 0.07, 0.1], dtype=np.float64)
+        choices = ['Very Low', 'Low', 'Average', 'Good', 'Excellent', 'Unknown']
+        codes = _bucket_codes(df['rent_yield'], edges)
+        df['yield_category'] = pd.Categorical.from_codes(np.where(codes < 0, len(edges) + 1, codes), categories=choices)
     return df
 
 def categorize_price(df):
     """Add a categorical column for price ranges."""
     if 'price' in df.columns:
-        bins = [0, 250000, 500000, 750000, 1000000, 1500000, 2000000, float('inf')]
+        edges = np.array([250000, 500000, 750000, 1000000, 1500000, 2000000], dtype=np.float64)
         labels = ['<$250K', '$250K-$500K', '$500K-$750K', '$750K-$1M', '$1M-$1.5M', '$1.5M-$2M', '$2M+']
-        df['price_category'] = pd.cut(df['price'], bins=bins, labels=labels)
+        codes = _bucket_codes(df['price'], edges, right=True)
+        # Like pd.cut's (0, 250000] first bin, non-positive prices get no category
+        codes[df['price'].to_numpy(dtype=np.float64, na_value=np.nan) <= 0] = -1
+        df['price_category'] = pd.Categorical.from_codes(codes, categories=labels, ordered=True)
     return df
 
 def enrich_dataframe(df):
     """Add calculated fields to the dataframe"""
-    # Ensure numeric columns are float type
+    # Ensure numeric columns are float type (database reads already are, so this is usually a no-op)
     numeric_columns = [
         'price', 'sqft', 'beds', 'baths', 'year_built', 
         'estimated_rent', 'price_per_sqft', 'walk_score',
@@ -61,38 +64,35 @@ def enrich_dataframe(df):
     ]
     for col in numeric_columns:
         if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        else:
+            if not pd.api.types.is_float_dtype(df[col]):
+                df[col] = pd.to_numeric(df[col], errors='coerce')
+        elif col in ('estimated_rent', 'price_per_sqft', 'estimated_monthly_cashflow'):
             # Initialize column if it doesn't exist
-            if col == 'estimated_rent':
-                df['estimated_rent'] = pd.Series(dtype='float64')
-            elif col == 'price_per_sqft':
-                df['price_per_sqft'] = pd.Series(dtype='float64')
-            elif col == 'estimated_monthly_cashflow':
-                df['estimated_monthly_cashflow'] = pd.Series(dtype='float64')
+            df[col] = np.nan
     
-    # Calculate price per square foot
-    # Check if necessary columns exist before calculation
-    if 'price' in df.columns and 'sqft' in df.columns:
-        mask = (df['price'].notna()) & (df['sqft'].notna()) & (df['sqft'] > 0)
-        df.loc[mask, 'price_per_sqft'] = df.loc[mask, 'price'] / df.loc[mask, 'sqft']
+    if 'price' not in df.columns:
+        return df
+
+    # Read each input column once, compute every derived field from the arrays, and assign them together
+    def column(name):
+        if name in df.columns:
+            return df[name].to_numpy(dtype=np.float64, copy=True, na_value=np.nan)
+        return np.full(len(df), np.nan)
+
+    price, sqft, rent = column('price'), column('sqft'), column('estimated_rent')
+    price_per_sqft, rent_yield = column('price_per_sqft'), column('rent_yield')
+    positive_price = price > 0
     
-    # Calculate estimated rent (using 0.8% rule) ONLY if missing or invalid
-    if 'price' in df.columns:
-        # Apply 0.8% rule only where estimated_rent is NaN AND price is valid
-        rent_missing_mask = df['estimated_rent'].isna()
-        price_valid_mask = df['price'].notna() & (df['price'] > 0)
-        combined_mask = rent_missing_mask & price_valid_mask
-        df.loc[combined_mask, 'estimated_rent'] = df.loc[combined_mask, 'price'] * 0.008
+    # Calculate price per square foot, keeping existing values where it can't be computed
+    np.divide(price, sqft, out=price_per_sqft, where=~np.isnan(price) & (sqft > 0))
+    
+    # Calculate estimated rent (using 0.8% rule) ONLY if missing and price is valid
+    rent = np.where(np.isnan(rent) & positive_price, price * 0.008, rent)
 
     # Calculate rent yield (annual rent / price)
-    # Check if necessary columns exist before calculation
-    if 'estimated_rent' in df.columns and 'price' in df.columns:
-        if 'rent_yield' not in df.columns:
-            df['rent_yield'] = pd.Series(dtype='float64')  # Initialize as float
-        mask = (df['estimated_rent'].notna()) & (df['price'].notna()) & (df['price'] > 0)
-        df.loc[mask, 'rent_yield'] = (df['estimated_rent'] * 12) / df.loc[mask, 'price']
-    
+    np.divide(rent * 12, price, out=rent_yield, where=~np.isnan(rent) & positive_price)
+
+    df[['price_per_sqft', 'estimated_rent', 'rent_yield']] = np.column_stack([price_per_sqft, rent, rent_yield])
     return df
 
 def format_currency(value):
@@ -107,33 +107,60 @@ def format_percentage(value):
         return 'N/A'
     return f"{value * 100:.2f}%"
 
+def _format_series(s, formatter, na_rep):
+    """Format each distinct numeric value once and broadcast the strings back; missing values become na_rep."""
+    values = pd.to_numeric(s, errors='coerce').to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    uniques, inverse = np.unique(values[valid], return_inverse=True)
+    labels = np.array([formatter(value) for value in uniques.tolist()], dtype=object)
+    out = np.full(len(values), na_rep, dtype=object)
+    out[valid] = labels[inverse]
+    return pd.Series(out, index=s.index, name=s.name)
+
+def format_currency_series(s, na_rep='N/A'):
+    """Format a Series as currency, like format_currency."""
+    return _format_series(s, lambda value: f"${value:,.0f}", na_rep)
+
+def format_percentage_series(s, na_rep='N/A'):
+    """Format a Series as percentages, like format_percentage."""
+    return _format_series(s, lambda value: f"{value * 100:.2f}%", na_rep)
+
 def get_top_properties_by_yield(df, n=10):
     """Get top N properties by rent yield."""
     if 'rent_yield' not in df.columns:
         return pd.DataFrame()
     
-    return df.sort_values('rent_yield', ascending=False).head(n)
+    yields = pd.to_numeric(df['rent_yield'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = np.flatnonzero(~np.isnan(yields))
+    if len(valid) > n:
+        # Partition out the n largest in O(N) and sort only those
+        valid = valid[np.argpartition(-yields[valid], n - 1)[:n]] if n > 0 else valid[:0]
+    top = valid[np.argsort(-yields[valid], kind='stable')]
+    if len(top) < n:
+        # Like sort_values().head(n), pad with rows missing a yield
+        top = np.concatenate([top, np.flatnonzero(np.isnan(yields))[:n - len(top)]])
+    return df.iloc[top]
 
 def get_properties_needing_enrichment(df):
-    """Get properties that need data enrichment."""
+    """Get boolean masks over df marking the properties that need data enrichment."""
     # Properties missing WalkScore data
-    walkscore_missing = df[df['walk_score'].isna()]
+    walkscore_missing = df['walk_score'].isna()
     
     # Properties missing transit and bike scores
-    transit_missing = df[df['transit_score'].isna()]
-    bike_missing = df[df['bike_score'].isna()]
+    transit_missing = df['transit_score'].isna()
+    bike_missing = df['bike_score'].isna()
     
     # Properties missing MLS info
-    mls_missing = df[df['mls_number'].isna() | df['mls_type'].isna()]
+    mls_missing = df['mls_number'].isna() | df['mls_type'].isna()
     
     # Properties missing tax info
-    tax_missing = df[df['tax_information'].isna()]
+    tax_missing = df['tax_information'].isna()
 
     # Properties missing cashflow info
     if 'estimated_monthly_cashflow' in df.columns:
-        cashflow_missing = df[df['estimated_monthly_cashflow'].isna()]
+        cashflow_missing = df['estimated_monthly_cashflow'].isna()
     else:
-        cashflow_missing = df.copy()
+        cashflow_missing = pd.Series(True, index=df.index)
     
     return {
         'walkscore_missing': walkscore_missing,
@@ -1,163 +1,615 @@
+import os
+import hashlib
+import itertools
 import sqlite3
+import threading
+import warnings
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from pathlib import Path
 import pandas as pd
 
-def get_db_connection(db_path):
-    """Connect to the SQLite database."""
-    return sqlite3.connect(db_path)
-
-def get_all_listings(db_path, limit=None):
-    """Get all property listings from the database."""
-    conn = get_db_connection(db_path)
-    # Explicitly list columns based on provided schema
-    columns = [
-        "id", "address", "city", "state", "zip", "price", "beds", "baths", "sqft",
-        "price_per_sqft", "url", "from_collection", "source", "imported_at",
-        "estimated_rent", "rent_yield", "mls_number", "mls_type", "tax_information",
-        "days_on_compass", "last_updated", "favorite", "year_built", "lot_size",
-        "hoa_fee", "parking", "heating", "cooling", "style", "construction",
-        "days_on_market", "status", "agent_name", "agent_phone", "agent_email",
-        "schools_json", "price_history_json", "walk_score", "transit_score", "bike_score",
-        "walkscore_shorturl", "compass_shorturl", "latitude", "longitude",
-        "created_at", "estimated_monthly_cashflow", "db_updated_at"
+try:
+    import adbc_driver_sqlite.dbapi as adbc_sqlite
+except ImportError:
+    adbc_sqlite = None
+
+try:
+    import apsw
+except ImportError:
+    apsw = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Parquet snapshots of the listings table, one per database version, in a per-user directory kept private (0700)
+LISTINGS_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "property-pipeline-ui"
+# Bump when the shape or dtypes of get_all_listings' result change, so older snapshots are ignored
+LISTINGS_CACHE_FORMAT = 3
+
+# Rows written per transaction by batch_update
+BATCH_UPDATE_SIZE = 500
+
+# Rows fetched per batch by the pandas read paths, bounding how many Python row tuples exist at once
+DEFAULT_CHUNKSIZE = 50000
+
+# Columns of the listings table selected by default, in order
+LISTING_COLUMNS = [
+    "id", "address", "city", "state", "zip", "price", "beds", "baths", "sqft",
+    "price_per_sqft", "url", "from_collection", "source", "imported_at",
+    "estimated_rent", "rent_yield", "mls_number", "mls_type", "tax_information",
+    "days_on_compass", "last_updated", "favorite", "year_built", "lot_size",
+    "hoa_fee", "parking", "heating", "cooling", "style", "construction",
+    "days_on_market", "status", "agent_name", "agent_phone", "agent_email",
+    "walk_score", "transit_score", "bike_score",
+    "walkscore_shorturl", "compass_shorturl", "latitude", "longitude",
+    "created_at", "estimated_monthly_cashflow", "db_updated_at"
+]
+# Large serialized JSON blobs, only read when named in get_all_listings' columns
+DETAIL_COLUMNS = ["schools_json", "price_history_json"]
+
+# dtypes the pandas read paths give the numeric listing columns
+LISTING_DTYPES = {
+    'price': 'float64',
+    'beds': 'float64',
+    'baths': 'float64',
+    'sqft': 'float64',
+    'price_per_sqft': 'float64',
+    'estimated_rent': 'float64',
+    'rent_yield': 'float64',
+    'year_built': 'float64',
+    'hoa_fee': 'float64',
+    'walk_score': 'float64',
+    'transit_score': 'float64',
+    'bike_score': 'float64',
+    'latitude': 'float64',
+    'longitude': 'float64',
+    'estimated_monthly_cashflow': 'float64',
+    'favorite': 'int64'
+}
+
+# Low-cardinality text columns returned as pandas categoricals (address and other free text stay object)
+CATEGORICAL_COLUMNS = [
+    'city', 'state', 'status', 'mls_type', 'from_collection', 'source',
+    'heating', 'cooling', 'style', 'construction', 'parking'
+]
+
+# SQL versions of the categorize_* buckets in data_processing, computed in the query so the
+# listings table, which the pipeline owns, is left as it is
+PRICE_CATEGORY_LABELS = ['<$250K', '$250K-$500K', '$500K-$750K', '$750K-$1M', '$1M-$1.5M', '$1.5M-$2M', '$2M+']
+CATEGORY_COLUMN_EXPRS = {
+    'price_category': """
+    CASE
+        WHEN price IS NULL OR price <= 0 THEN NULL
+        WHEN price <= 250000 THEN '<$250K'
+        WHEN price <= 500000 THEN '$250K-$500K'
+        WHEN price <= 750000 THEN '$500K-$750K'
+        WHEN price <= 1000000 THEN '$750K-$1M'
+        WHEN price <= 1500000 THEN '$1M-$1.5M'
+        WHEN price <= 2000000 THEN '$1.5M-$2M'
+        ELSE '$2M+'
+    END""",
+    'walk_score_category': """
+    CASE
+        WHEN walk_score IS NULL THEN 'Unknown'
+        WHEN walk_score < 50 THEN 'Car-Dependent'
+        WHEN walk_score < 70 THEN 'Somewhat Walkable'
+        WHEN walk_score < 90 THEN 'Very Walkable'
+        ELSE 'Walker''s Paradise'
+    END""",
+    'yield_category': """
+    CASE
+        WHEN rent_yield IS NULL THEN 'Unknown'
+        WHEN rent_yield < 0.03 THEN 'Very Low'
+        WHEN rent_yield < 0.05 THEN 'Low'
+        WHEN rent_yield < 0.07 THEN 'Average'
+        WHEN rent_yield < 0.1 THEN 'Good'
+        ELSE 'Excellent'
+    END""",
+}
+CATEGORY_COLUMNS_SQL = ",".join(f"{expr} AS {name}" for name, expr in CATEGORY_COLUMN_EXPRS.items())
+
+# Columns get_filtered_listings accepts filters on; names are checked here before being quoted into SQL
+FILTERABLE_COLUMNS = frozenset(LISTING_COLUMNS) | frozenset(CATEGORY_COLUMN_EXPRS)
+
+# Applied to each long-lived connection: WAL so readers don't block on writers, plus a larger page cache and mmap reads
+SQLITE_READ_PRAGMAS = (
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+) + SQLITE_READ_PRAGMAS
+
+# Created by ensure_indexes if missing when a database is first opened. (city, price) serves the city +
+# price range reads and is a covering index for the per-city summary; mls_type covers the MLS-type
+# summary; price, sqft and price_per_sqft serve the range filters. The NOCASE index serves the
+# case-insensitive blacklist lookups, turning the per-listing NOT EXISTS scan into an index search.
+SQLITE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_listings_city_price ON listings(city, price)",
+    "CREATE INDEX IF NOT EXISTS idx_listings_mls_type ON listings(mls_type)",
+    "CREATE INDEX IF NOT EXISTS idx_listings_price ON listings(price)",
+    "CREATE INDEX IF NOT EXISTS idx_listings_sqft ON listings(sqft)",
+    "CREATE INDEX IF NOT EXISTS idx_listings_price_per_sqft ON listings(price_per_sqft)",
+    "CREATE INDEX IF NOT EXISTS idx_blacklist_address_nocase ON address_blacklist(address COLLATE NOCASE)",
+)
+
+# Long-lived connections, one per database file, shared by every Streamlit session thread
+_CONN_CACHE = {}
+# Read-only apsw connections for the bulk listing reads, one per database file
+_APSW_CONN_CACHE = {}
+# Guards the connection caches and serializes all use of the shared connections, since a sqlite3
+# connection isn't safe to use from several threads at once
+_DB_LOCK = threading.RLock()
+
+def _serialized(func):
+    """Run func while holding _DB_LOCK."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with _DB_LOCK:
+            return func(*args, **kwargs)
+    return wrapper
+
+# Fetch bulk listing reads through apsw when it is installed; its row fetching is cheaper than sqlite3's
+USE_APSW = True
+
+# get_summary_stats results by database path, as (database version, stats)
+_summary_cache = {}
+
+@contextmanager
+def shared_connection(db_path):
+    """Use the shared long-lived connection to db_path for the duration of a with block.
+    Holds _DB_LOCK meanwhile; callers must not close the connection."""
+    with _DB_LOCK:
+        yield _get_conn(db_path)
+
+def _get_conn(db_path):
+    """Get the shared autocommit connection for db_path, opening and tuning it on first use.
+    Callers hold _DB_LOCK while using it."""
+    with _DB_LOCK:
+        conn = _CONN_CACHE.get(db_path)
+        if conn is None:
+            conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, cached_statements=256)
+            for pragma in SQLITE_PRAGMAS:
+                try:
+                    conn.execute(pragma)
+                except sqlite3.Error as e:
+                    print(f"Error applying {pragma}: {e}")
+            ensure_indexes(conn)
+            _CONN_CACHE[db_path] = conn
+        return conn
+
+def _get_apsw_conn(db_path):
+    """Get the shared read-only apsw connection for db_path, opening and tuning it on first use.
+    Callers hold _DB_LOCK while using it."""
+    with _DB_LOCK:
+        conn = _APSW_CONN_CACHE.get(db_path)
+        if conn is None:
+            conn = apsw.Connection(db_path, flags=apsw.SQLITE_OPEN_READONLY)
+            # The journal PRAGMAs can't be set on a read-only connection
+            for pragma in SQLITE_READ_PRAGMAS:
+                try:
+                    conn.execute(pragma)
+                except apsw.Error as e:
+                    print(f"Error applying {pragma}: {e}")
+            _APSW_CONN_CACHE[db_path] = conn
+        return conn
+
+def ensure_indexes(conn):
+    """Create the indexes in SQLITE_INDEXES that don't exist yet."""
+    for index in SQLITE_INDEXES:
+        try:
+            conn.execute(index)
+        except sqlite3.Error as e:
+            print(f"Error creating index: {e}")
+
+def _category_dtypes(df):
+    """Give the category columns present in df their categorical dtypes (price ordered)."""
+    if 'price_category' in df.columns:
+        df['price_category'] = pd.Categorical(df['price_category'], categories=PRICE_CATEGORY_LABELS, ordered=True)
+    for col in ('walk_score_category', 'yield_category'):
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+def _db_version(db_path):
+    """Stat signature of the database and its WAL file, or None if the database doesn't exist."""
+    try:
+        stat = os.stat(db_path)
+    except OSError:
+        return None
+    version = (stat.st_mtime_ns, stat.st_size)
+    try:
+        wal_stat = os.stat(f"{db_path}-wal")
+    except OSError:
+        return version
+    # An empty WAL (just created, or truncated by a checkpoint) holds no changes of its own
+    if wal_stat.st_size:
+        version += (wal_stat.st_mtime_ns, wal_stat.st_size)
+    return version
+
+def get_db_mtime(db_path):
+    """Get the database's modification time, counting its WAL file, or None if it doesn't exist."""
+    version = _db_version(db_path)
+    if version is None:
+        return None
+    return max(version[0::2]) / 1e9
+
+def _categorize_columns(df):
+    """Dictionary-encode the CATEGORICAL_COLUMNS present in df, in place."""
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = df[col].astype('category')
+    return df
+
+def _read_sql_arrow(db_path, query, params=None):
+    """Run a query through the ADBC SQLite driver and return an Arrow-backed DataFrame."""
+    with adbc_sqlite.connect(db_path) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params or None)
+            table = cursor.fetch_arrow_table()
+    return table.to_pandas(types_mapper=pd.ArrowDtype, split_blocks=True, self_destruct=True)
+
+def _read_sql_batches(conn, query, params=None, chunksize=10000):
+    """Fetch a query chunksize rows at a time, moving each chunk into Arrow before fetching the next,
+    so only one chunk of Python row objects is alive at once. Returns an Arrow-backed DataFrame."""
+    tables = [
+        pa.Table.from_pandas(chunk, preserve_index=False)
+        for chunk in pd.read_sql_query(query, conn, params=params, chunksize=chunksize)
+    ]
+    if not tables:
+        return _fast_read(conn, query, params)
+    # Columns that are all NULL in one chunk arrive as the null type; permissive promotion unifies them
+    table = pa.concat_tables(tables, promote_options='permissive')
+    return table.to_pandas(types_mapper=pd.ArrowDtype, split_blocks=True, self_destruct=True)
+
+def _listings_cache_dir():
+    """LISTINGS_CACHE_DIR, created with mode 0700 if missing, or None if it isn't private to this user."""
+    try:
+        LISTINGS_CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+        stat = LISTINGS_CACHE_DIR.stat()
+        if hasattr(os, 'getuid'):
+            if stat.st_uid != os.getuid():
+                print(f"Error: listings cache {LISTINGS_CACHE_DIR} is owned by another user, not using it")
+                return None
+            if stat.st_mode & 0o077:
+                LISTINGS_CACHE_DIR.chmod(0o700)
+    except OSError as e:
+        print(f"Error preparing listings cache {LISTINGS_CACHE_DIR}: {e}")
+        return None
+    return LISTINGS_CACHE_DIR
+
+def _concat_chunks(chunks):
+    """Join DataFrame chunks of one result set into a single frame."""
+    if len(chunks) == 1:
+        return chunks[0]
+    with warnings.catch_warnings():
+        # A column that is all NULL in one chunk comes back as object; infer_objects restores its dtype
+        warnings.simplefilter('ignore', FutureWarning)
+        df = pd.concat(chunks, ignore_index=True, copy=False)
+    return df.infer_objects()
+
+def _frame_from_rows(fetch, names, dtype=None, chunked=False):
+    """Build a DataFrame from the rows fetch() returns, calling it until it returns none when chunked.
+    dtype is applied per chunk, as pd.read_sql_query does."""
+    chunks = []
+    while True:
+        rows = fetch()
+        if not rows and chunks:
+            break
+        chunk = pd.DataFrame.from_records(rows, columns=names, coerce_float=True)
+        chunks.append(chunk.astype(dtype) if dtype else chunk)
+        if not rows or not chunked:
+            break
+    return _concat_chunks(chunks)
+
+def _fast_read(conn, query, params=(), dtype=None, chunksize=None):
+    """Run a query on a sqlite3 connection into a DataFrame, like pd.read_sql_query without its
+    per-call driver detection. Rows are fetched chunksize at a time when chunksize is set."""
+    cursor = conn.execute(query, params or ())
+    names = [desc[0] for desc in cursor.description]
+    if chunksize:
+        return _frame_from_rows(lambda: cursor.fetchmany(chunksize), names, dtype, chunked=True)
+    return _frame_from_rows(cursor.fetchall, names, dtype)
+
+def _read_sql_apsw(db_path, query, params=(), dtype=None, chunksize=None):
+    """Run a query through apsw, whose row fetching is cheaper than sqlite3's on large reads.
+    Returns None when apsw is unavailable or the result is empty, so the caller reads it through sqlite3."""
+    if apsw is None or not USE_APSW:
+        return None
+    try:
+        cursor = _get_apsw_conn(db_path).cursor().execute(query, tuple(params or ()))
+        # apsw only describes a statement that still has rows to return, so an empty result
+        # raises here and is left to the sqlite3 path, which cheaply returns the empty frame
+        names = [desc[0] for desc in cursor.description]
+        if chunksize:
+            return _frame_from_rows(lambda: list(itertools.islice(cursor, chunksize)), names, dtype, chunked=True)
+        return _frame_from_rows(cursor.fetchall, names, dtype)
+    except apsw.ExecutionCompleteError:
+        return None
+    except Exception as e:
+        print(f"Error reading through apsw, falling back to sqlite3: {e}")
+        return None
+
+def _listings_cache_file(db_path):
+    """Snapshot path for the listings table at the database's current version,
+    or None if the database doesn't exist or there is no usable cache directory."""
+    version = _db_version(db_path)
+    if version is None:
+        return None
+    cache_dir = _listings_cache_dir()
+    if cache_dir is None:
+        return None
+    key = hashlib.sha1(os.path.abspath(db_path).encode()).hexdigest()[:12]
+    return cache_dir / f"listings_{key}_{'-'.join(map(str, version))}-v{LISTINGS_CACHE_FORMAT}.parquet"
+
+def _read_listings_cache(cache_file, price_min=None, price_max=None, cities=None, columns=None):
+    """Read a listings snapshot, letting Parquet row-group stats skip rows outside the filters."""
+    filters = []
+    if price_min is not None:
+        filters.append(('price', '>=', price_min))
+    if price_max is not None:
+        filters.append(('price', '<=', price_max))
+    if cities:
+        filters.append(('city', 'in', list(cities)))
+    # Categoricals with no values come back from Parquet as object, so they are converted again
+    return _categorize_columns(pq.read_table(cache_file, columns=columns, filters=filters or None).to_pandas())
+
+def _write_listings_cache(cache_file, df):
+    """Best-effort write of a listings snapshot, removing older snapshots of the same database."""
+    try:
+        tmp_file = cache_file.with_suffix('.tmp')
+        df.to_parquet(tmp_file, engine='pyarrow', compression='zstd', row_group_size=50000, index=False)
+        os.replace(tmp_file, cache_file)
+        prefix = cache_file.name.rsplit('_', 1)[0]
+        for old_file in cache_file.parent.glob(f"{prefix}_*.parquet"):
+            if old_file != cache_file:
+                old_file.unlink(missing_ok=True)
+    except Exception as e:
+        print(f"Error writing listings cache {cache_file}: {e}")
+
+@_serialized
+def get_all_listings(db_path, limit=None, price_min=None, price_max=None, cities=None, engine=None, columns=None,
+                     chunksize=DEFAULT_CHUNKSIZE):
+    """Get all property listings from the database, optionally filtered by price range and cities.
+    engine='arrow' returns Arrow-backed columns, read through ADBC when adbc_driver_sqlite is installed
+    and otherwise streamed in chunks through pyarrow.
+    columns limits the SELECT to a subset of LISTING_COLUMNS, DETAIL_COLUMNS and the category columns;
+    None selects LISTING_COLUMNS. Rows are fetched chunksize at a time; chunksize=None fetches them in one go."""
+    if columns is None:
+        columns = LISTING_COLUMNS
+    else:
+        unknown = [
+            col for col in columns
+            if col not in LISTING_COLUMNS and col not in DETAIL_COLUMNS and col not in CATEGORY_COLUMN_EXPRS
+        ]
+        if unknown:
+            print(f"Error: unknown listing columns {unknown}")
+            return pd.DataFrame()
+        columns = list(columns)
+
+    # Opened before the snapshot key is taken, since its first-open setup (WAL) changes the file's version
+    conn = _get_conn(db_path)
+    # Serve repeat reads from the Parquet snapshot of this database version when pyarrow is available
+    use_cache = pq is not None and engine != 'arrow' and not limit and all(col in LISTING_COLUMNS for col in columns)
+    cache_file = _listings_cache_file(db_path) if use_cache else None
+    if cache_file is not None and cache_file.exists():
+        try:
+            return _read_listings_cache(cache_file, price_min, price_max, cities, columns)
+        except Exception as e:
+            print(f"Error reading listings cache {cache_file}: {e}")
+    
+    select_items = [
+        f"{CATEGORY_COLUMN_EXPRS[col]} AS {col}" if col in CATEGORY_COLUMN_EXPRS else f'"{col}"'
+        for col in columns
     ]
-    query = f"SELECT {', '.join([f'\"{col}\"' for col in columns])} FROM listings"
+    query = f"SELECT {', '.join(select_items)} FROM listings"
+    conditions = []
+    params = []
+    if price_min is not None:
+        conditions.append("price >= ?")
+        params.append(price_min)
+    if price_max is not None:
+        conditions.append("price <= ?")
+        params.append(price_max)
+    if cities:
+        conditions.append(f"city IN ({', '.join('?' * len(cities))})")
+        params.extend(cities)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
     if limit:
         query += f" LIMIT {limit}"
     try:
-        # Define dtype dictionary for numeric columns
-        dtype_dict = {
-            'price': 'float64',
-            'beds': 'float64',
-            'baths': 'float64',
-            'sqft': 'float64',
-            'price_per_sqft': 'float64',
-            'estimated_rent': 'float64',
-            'rent_yield': 'float64',
-            'year_built': 'float64',
-            'hoa_fee': 'float64',
-            'walk_score': 'float64',
-            'transit_score': 'float64',
-            'bike_score': 'float64',
-            'latitude': 'float64',
-            'longitude': 'float64',
-            'estimated_monthly_cashflow': 'float64',
-            'favorite': 'int64'
-        }
-        df = pd.read_sql_query(query, conn, dtype=dtype_dict)
-        conn.close()
-        return df
+        if engine == 'arrow' and adbc_sqlite is not None:
+            # Arrow carries the column types, so no dtype mapping is needed
+            df = _read_sql_arrow(db_path, query, params)
+        elif engine == 'arrow' and pa is not None:
+            df = _read_sql_batches(conn, query, params)
+        else:
+            dtype_dict = {col: dtype for col, dtype in LISTING_DTYPES.items() if col in columns}
+            chunksize = None if limit and chunksize and limit <= chunksize else chunksize
+            df = _read_sql_apsw(db_path, query, params, dtype_dict, chunksize)
+            if df is None:
+                df = _fast_read(conn, query, params, dtype_dict, chunksize)
+            df = _categorize_columns(df)
+            if cache_file is not None and not params and columns is LISTING_COLUMNS:
+                _write_listings_cache(cache_file, df)
+        return _category_dtypes(df)
     except Exception as e:
         print(f"Error executing query: {query}")
+        print(f"Params: {params}")
         print(f"Error: {e}")
-        conn.close()
         return pd.DataFrame()
 
-def get_filtered_listings(db_path, filters=None):
-    """Get property listings with filters applied."""
-    conn = get_db_connection(db_path)
-    # Explicitly list columns based on provided schema
-    columns = [
-        "id", "address", "city", "state", "zip", "price", "beds", "baths", "sqft",
-        "price_per_sqft", "url", "from_collection", "source", "imported_at",
-        "estimated_rent", "rent_yield", "mls_number", "mls_type", "tax_information",
-        "days_on_compass", "last_updated", "favorite", "year_built", "lot_size",
-        "hoa_fee", "parking", "heating", "cooling", "style", "construction",
-        "days_on_market", "status", "agent_name", "agent_phone", "agent_email",
-        "schools_json", "price_history_json", "walk_score", "transit_score", "bike_score",
-        "walkscore_shorturl", "compass_shorturl", "latitude", "longitude",
-        "created_at", "estimated_monthly_cashflow", "db_updated_at"
-    ]
+def build_filter_shape(filters):
+    """Split get_filtered_listings filters into a shape, a tuple of (column, operator) pairs, and the
+    parameters bound to it. Raises ValueError for columns outside FILTERABLE_COLUMNS."""
+    shape = []
+    params = []
+    for column, value in (filters or {}).items():
+        if column not in FILTERABLE_COLUMNS:
+            raise ValueError(f"cannot filter on unknown column {column!r}")
+        if isinstance(value, tuple) and len(value) == 2:
+            min_val, max_val = value
+            if min_val is not None:
+                shape.append((column, '>='))
+                params.append(min_val)
+            if max_val is not None:
+                shape.append((column, '<='))
+                params.append(max_val)
+        elif isinstance(value, tuple) and value[0] == "IS NOT NULL":
+            shape.append((column, 'IS NOT NULL'))
+        else:
+            shape.append((column, '='))
+            params.append(value)
+    return tuple(shape), params
+
+def build_order_shape(order_by, paged=False):
+    """Normalize get_filtered_listings' order_by into a tuple of (column, direction) pairs.
+    order_by is a column name or a sequence of them, each prefixed with '-' for descending.
+    Paged reads get id as a final tie-breaker so pages don't overlap or skip rows.
+    Raises ValueError for columns outside FILTERABLE_COLUMNS."""
+    if isinstance(order_by, str):
+        order_by = [order_by]
+    order = []
+    for key in order_by or ():
+        column, direction = (key[1:], 'DESC') if key.startswith('-') else (key, 'ASC')
+        if column not in FILTERABLE_COLUMNS:
+            raise ValueError(f"cannot order by unknown column {column!r}")
+        order.append((column, direction))
+    if paged and 'id' not in [column for column, _ in order]:
+        order.append(('id', 'ASC'))
+    return tuple(order)
+
+@lru_cache(maxsize=128)
+def _filtered_listings_sql(shape, categorize, order=(), paged=False):
+    """SQL for get_filtered_listings given the filter shape, a tuple of (column, operator) pairs,
+    and the order from build_order_shape. paged adds LIMIT and OFFSET placeholders.
+    Identical shapes give identical SQL text, so sqlite3's statement cache skips the re-parse."""
+    select_list = ', '.join([f'"{col}"' for col in LISTING_COLUMNS])
+    if categorize:
+        select_list += ", " + CATEGORY_COLUMNS_SQL
     query = f"""
-        SELECT {', '.join([f'\"{col}\"' for col in columns])} 
+        SELECT {select_list} 
         FROM listings l
         WHERE 1=1
         AND NOT EXISTS (
             SELECT 1 FROM address_blacklist b 
-            WHERE LOWER(l.address) = LOWER(b.address)
+            WHERE b.address = l.address COLLATE NOCASE
         )
     """
-    params = []
-    if filters:
-        for column, value in filters.items():
-            if isinstance(value, tuple) and len(value) == 2:
-                min_val, max_val = value
-                if min_val is not None:
-                    query += f" AND {column} >= ?"
-                    params.append(min_val)
-                if max_val is not None:
-                    query += f" AND {column} <= ?"
-                    params.append(max_val)
-            elif isinstance(value, tuple) and value[0] == "IS NOT NULL":
-                query += f" AND {column} IS NOT NULL"
-            else:
-                query += f" AND {column} = ?"
-                params.append(value)
+    for column, op in shape:
+        # Category columns aren't stored, so they are filtered through their expressions
+        target = f"({CATEGORY_COLUMN_EXPRS[column]})" if column in CATEGORY_COLUMN_EXPRS else f'"{column}"'
+        if op == 'IS NOT NULL':
+            query += f' AND {target} IS NOT NULL'
+        else:
+            query += f' AND {target} {op} ?'
+    if order:
+        query += ' ORDER BY ' + ', '.join(
+            f"({CATEGORY_COLUMN_EXPRS[column]}) {direction}" if column in CATEGORY_COLUMN_EXPRS
+            else f'"{column}" {direction}'
+            for column, direction in order
+        )
+    if paged:
+        query += ' LIMIT ? OFFSET ?'
+    return query
+
+@_serialized
+def get_filtered_listings(db_path, filters=None, engine=None, categorize=False, chunksize=DEFAULT_CHUNKSIZE,
+                          limit=None, offset=None, order_by=None):
+    """Get property listings with filters applied. engine='arrow' and chunksize behave as in get_all_listings.
+    categorize=True adds price_category, walk_score_category and yield_category computed in SQL.
+    limit and offset page through the matches in the database; order_by (see build_order_shape) should
+    be given with them, since without it SQLite doesn't promise the same row order from one page to the next."""
+    conn = _get_conn(db_path)
+    paged = limit is not None or offset is not None
     try:
-        df = pd.read_sql_query(query, conn, params=params)
-        conn.close()
-        return df
+        shape, params = build_filter_shape(filters)
+        order = build_order_shape(order_by, paged)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return pd.DataFrame()
+    if paged:
+        # A negative LIMIT means no limit to SQLite, for an offset without one
+        params = params + [int(limit) if limit is not None else -1, int(offset or 0)]
+    query = _filtered_listings_sql(shape, categorize, order, paged)
+    try:
+        if engine == 'arrow' and adbc_sqlite is not None:
+            df = _read_sql_arrow(db_path, query, params)
+        elif engine == 'arrow' and pa is not None:
+            df = _read_sql_batches(conn, query, params)
+        else:
+            df = _read_sql_apsw(db_path, query, params, LISTING_DTYPES, chunksize)
+            if df is None:
+                df = _fast_read(conn, query, params, LISTING_DTYPES, chunksize)
+            df = _categorize_columns(df)
+        return _category_dtypes(df)
     except Exception as e:
         print(f"Error executing query: {query}")
         print(f"Params: {params}")
         print(f"Error: {e}")
-        conn.close()
         return pd.DataFrame()
 
+@_serialized
 def get_summary_stats(db_path):
-    """Get summary statistics for the database."""
-    conn = get_db_connection(db_path)
+    """Get summary statistics for the database, reusing the last result while the database is unchanged."""
+    # Open the connection first: its first-open setup (WAL, indexes) changes the file's version
+    _get_conn(db_path)
+    version = _db_version(db_path)
+    cached = _summary_cache.get(db_path)
+    if cached is None or version is None or cached[0] != version:
+        cached = (version, _compute_summary_stats(db_path))
+        if version is not None:
+            _summary_cache[db_path] = cached
+    # Copy the frames so callers can't modify the cached ones
+    return {key: value.copy() if isinstance(value, pd.DataFrame) else value for key, value in cached[1].items()}
+
+def _compute_summary_stats(db_path):
+    """Run the summary statistics queries."""
+    conn = _get_conn(db_path)
     stats = {}
     
-    # Total count
-    query = "SELECT COUNT(*) as count FROM listings"
-    result = pd.read_sql_query(query, conn)
-    stats['total_count'] = result['count'].iloc[0]
-    
-    # Average price
-    query = "SELECT AVG(price) as avg_price FROM listings WHERE price IS NOT NULL"
-    result = pd.read_sql_query(query, conn)
-    stats['avg_price'] = result['avg_price'].iloc[0]
-    
-    # Average sqft
-    query = "SELECT AVG(sqft) as avg_sqft FROM listings WHERE sqft IS NOT NULL"
-    result = pd.read_sql_query(query, conn)
-    stats['avg_sqft'] = result['avg_sqft'].iloc[0]
-    
-    # Average price per sqft
-    query = "SELECT AVG(price_per_sqft) as avg_price_per_sqft FROM listings WHERE price_per_sqft IS NOT NULL"
-    result = pd.read_sql_query(query, conn)
-    stats['avg_price_per_sqft'] = result['avg_price_per_sqft'].iloc[0]
-    
-    # Average scores
-    query = """
+    # Count and averages from a single table scan (AVG already skips NULLs)
+    row = conn.execute("""
         SELECT 
-            AVG(walk_score) as avg_walk_score,
-            AVG(transit_score) as avg_transit_score,
-            AVG(bike_score) as avg_bike_score
-        FROM listings 
-        WHERE walk_score IS NOT NULL 
-        OR transit_score IS NOT NULL 
-        OR bike_score IS NOT NULL
-    """
-    result = pd.read_sql_query(query, conn)
-    stats['avg_walk_score'] = result['avg_walk_score'].iloc[0]
-    stats['avg_transit_score'] = result['avg_transit_score'].iloc[0]
-    stats['avg_bike_score'] = result['avg_bike_score'].iloc[0]
-    
-    # City counts
-    query = "SELECT city, COUNT(*) as count FROM listings WHERE city IS NOT NULL GROUP BY city ORDER BY count DESC LIMIT 10"
-    stats['city_counts'] = pd.read_sql_query(query, conn)
+            COUNT(*),
+            AVG(price),
+            AVG(sqft),
+            AVG(price_per_sqft),
+            AVG(walk_score),
+            AVG(transit_score),
+            AVG(bike_score)
+        FROM listings
+    """).fetchone()
+    (
+        stats['total_count'],
+        stats['avg_price'],
+        stats['avg_sqft'],
+        stats['avg_price_per_sqft'],
+        stats['avg_walk_score'],
+        stats['avg_transit_score'],
+        stats['avg_bike_score']
+    ) = row
     
-    # Average price by city
-    query = """
-        SELECT city, AVG(price) as avg_price 
+    # Per-city count and average price from one GROUP BY; the top 10 of each are picked in pandas
+    city_stats = _fast_read(conn, """
+        SELECT city, COUNT(*) as count, AVG(price) as avg_price 
         FROM listings 
-        WHERE city IS NOT NULL AND price IS NOT NULL 
+        WHERE city IS NOT NULL 
         GROUP BY city 
-        ORDER BY avg_price DESC 
-        LIMIT 10
-    """
-    stats['city_prices'] = pd.read_sql_query(query, conn)
+        ORDER BY city
+    """)
+    stats['city_counts'] = city_stats.nlargest(10, 'count')[['city', 'count']].reset_index(drop=True)
+    stats['city_prices'] = (
+        city_stats.dropna(subset=['avg_price']).nlargest(10, 'avg_price')[['city', 'avg_price']].reset_index(drop=True)
+    )
     
     # MLS type distribution
     query = """
@@ -167,123 +619,129 @@ def get_summary_stats(db_path):
         GROUP BY mls_type 
         ORDER BY count DESC
     """
-    stats['mls_types'] = pd.read_sql_query(query, conn)
+    stats['mls_types'] = _fast_read(conn, query)
     
     return stats
 
+@_serialized
 def get_blacklisted_addresses(db_path):
     """Get all blacklisted addresses from the database."""
-    conn = get_db_connection(db_path)
+    conn = _get_conn(db_path)
     try:
-        df = pd.read_sql_query("""
+        df = _fast_read(conn, """
             SELECT address, reason, blacklisted_at 
             FROM address_blacklist 
             ORDER BY blacklisted_at DESC
-        """, conn)
+        """)
         return df
     except Exception as e:
         print(f"Error fetching blacklisted addresses: {e}")
         return pd.DataFrame()
-    finally:
-        conn.close()
 
+@_serialized
 def is_address_blacklisted(db_path, address):
     """Check if an address is blacklisted."""
-    conn = get_db_connection(db_path)
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT 1 FROM address_blacklist 
-            WHERE LOWER(address) = LOWER(?)
-        """, (address,))
-        return cursor.fetchone() is not None
-    finally:
-        conn.close()
+    conn = _get_conn(db_path)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT 1 FROM address_blacklist 
+        WHERE address = ? COLLATE NOCASE
+    """, (address,))
+    return cursor.fetchone() is not None
 
+@_serialized
 def add_to_blacklist(db_path, address, reason=None):
     """Add an address to the blacklist."""
-    conn = get_db_connection(db_path)
+    conn = _get_conn(db_path)
     try:
         cursor = conn.cursor()
         cursor.execute("""
             INSERT OR IGNORE INTO address_blacklist (address, reason)
             VALUES (?, ?)
         """, (address, reason))
-        conn.commit()
         return cursor.rowcount > 0
     except Exception as e:
         print(f"Error adding address to blacklist: {e}")
         return False
-    finally:
-        conn.close()
 
+@_serialized
 def remove_from_blacklist(db_path, address):
     """Remove an address from the blacklist."""
-    conn = get_db_connection(db_path)
+    conn = _get_conn(db_path)
     try:
         cursor = conn.cursor()
         cursor.execute("""
             DELETE FROM address_blacklist 
-            WHERE LOWER(address) = LOWER(?)
+            WHERE address = ? COLLATE NOCASE
         """, (address,))
-        conn.commit()
         return cursor.rowcount > 0
     except Exception as e:
         print(f"Error removing address from blacklist: {e}")
         return False
-    finally:
-        conn.close()
 
+@_serialized
 def toggle_favorite(db_path, listing_id, is_favorite):
     """Toggle the favorite status of a listing."""
-    # print(f"[DEBUG] toggle_favorite called with db_path={db_path}, id={listing_id}, is_favorite={is_favorite}")
-    conn = get_db_connection(db_path)
+    conn = _get_conn(db_path)
     try:
-        cursor = conn.cursor()
-        # First check if the listing exists
-        cursor.execute("SELECT id FROM listings WHERE id = ?", (listing_id,))
-        if not cursor.fetchone():
-            # print(f"[DEBUG] Listing {listing_id} not found in database")
-            return False
-            
-        # Get current favorite status
-        cursor.execute("SELECT favorite FROM listings WHERE id = ?", (listing_id,))
-        # current_status = cursor.fetchone()
-        # print(f"[DEBUG] Current favorite status: {current_status[0] if current_status else 'None'}")
-        
-        # Update the favorite status
-        cursor.execute("""
-            UPDATE listings 
-            SET favorite = ? 
-            WHERE id = ?
-        """, (1 if is_favorite else 0, listing_id))
-        conn.commit()
-        # print(f"[DEBUG] Rows updated: {cursor.rowcount}")
-        
-        # Verify the update
-        cursor.execute("SELECT favorite FROM listings WHERE id = ?", (listing_id,))
-        # new_status = cursor.fetchone()
-        # print(f"[DEBUG] New favorite status: {new_status[0] if new_status else 'None'}")
-        
+        cursor = conn.execute(
+            "UPDATE listings SET favorite = ? WHERE id = ?",
+            (1 if is_favorite else 0, listing_id),
+        )
         return cursor.rowcount > 0
     except Exception as e:
         print(f"Error toggling favorite status: {e}") # Keep this error print for actual errors
         return False
-    finally:
-        conn.close()
 
+@_serialized
+def batch_update(db_path, table, rows, key='id', batch_size=BATCH_UPDATE_SIZE):
+    """Write back rows, dicts of column values that each include key, with one
+    UPDATE ... WHERE key = ? per row and one BEGIN IMMEDIATE transaction per batch_size rows
+    (all of them when batch_size is None). Returns the number of rows updated.
+    Raises ValueError for a table or column the database doesn't have."""
+    conn = _get_conn(db_path)
+    # Names are quoted into the SQL, so they must match the schema exactly
+    columns = {row[1] for row in conn.execute("SELECT * FROM pragma_table_info(?)", (table,))}
+    if not columns:
+        raise ValueError(f"unknown table {table!r}")
+
+    # Rows setting the same columns share one statement, so they can go through executemany together
+    statements = {}
+    for row in rows:
+        names = tuple(name for name in row if name != key)
+        unknown = [name for name in names + (key,) if name not in columns]
+        if unknown:
+            raise ValueError(f"unknown columns {unknown} in {table!r}")
+        if names:
+            statements.setdefault(names, []).append(tuple(row[name] for name in names) + (row[key],))
+
+    updated = 0
+    for names, params in statements.items():
+        assignments = ", ".join(f'"{name}" = ?' for name in names)
+        query = f'UPDATE "{table}" SET {assignments} WHERE "{key}" = ?'
+        step = batch_size or len(params)
+        for start in range(0, len(params), step):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = conn.executemany(query, params[start:start + step])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            updated += cursor.rowcount
+    return updated
+
+@_serialized
 def get_favorites(db_path):
     """Get all favorite listings from the database."""
-    conn = get_db_connection(db_path)
+    conn = _get_conn(db_path)
     try:
-        df = pd.read_sql_query("""
+        df = _fast_read(conn, """
             SELECT * FROM listings 
             WHERE favorite = 1
             ORDER BY last_updated DESC
-        """, conn)
+        """)
         return df
     except Exception as e:
         print(f"Error fetching favorites: {e}")
         return pd.DataFrame()
-    finally:
-        conn.close()
@@ -1,86 +1,223 @@
 import subprocess
 import sys
+import atexit
+import functools
 import os
 from pathlib import Path
 import time
+import ast
+import json
+import re
+import threading
 
-def run_script(script_path, args=None, capture_output=True):
-    """Run a Python script with arguments."""
-    cmd = [sys.executable, str(script_path)]
+__all__ = [
+    'run_script',
+    'run_script_json',
+    'is_script_running',
+    'run_gmail_parser',
+    'run_compass_enrichment',
+    'run_walkscore_enrichment',
+    'run_cashflow_enrichment',
+    'run_init_db',
+    'run_cashflow_analyzer',
+    'get_script_progress',
+    'new_script_progress',
+    'update_script_progress',
+]
+
+# Script subprocesses currently running. Anything still alive when the
+# interpreter exits is killed so an abandoned run doesn't outlive the app.
+_active_processes = set()
+
+def _kill_active_processes():
+    for proc in list(_active_processes):
+        if proc.poll() is None:
+            proc.kill()
+
+atexit.register(_kill_active_processes)
+
+# Exceptions that mean a run failed or was interrupted, so its child is killed. Other
+# BaseExceptions only unwind the caller (Streamlit's rerun and stop signals are BaseExceptions)
+_RUN_ERRORS = (Exception, KeyboardInterrupt, SystemExit)
+
+def is_script_running(script_path):
+    """Check whether a run of the given script is still in flight."""
+    script_path = str(script_path)
+    return any(
+        proc.args[1] == script_path and proc.poll() is None
+        for proc in list(_active_processes)
+    )
+
+@functools.lru_cache(maxsize=32)
+def _base_command(script_path):
+    """Interpreter + script argv prefix, built once per script path."""
+    return (sys.executable, str(script_path))
+
+def _stream_output(proc, on_line, timeout):
+    """Read a child's stdout line by line as it runs, passing each line to on_line."""
+    # stderr is drained on a thread so a chatty stderr can't fill its pipe and stall the child
+    stderr_lines = []
+    stderr_reader = threading.Thread(target=stderr_lines.extend, args=(proc.stderr,), daemon=True)
+    stderr_reader.start()
+
+    timed_out = threading.Event()
+    def _expire():
+        timed_out.set()
+        proc.kill()
+    timer = threading.Timer(timeout, _expire) if timeout else None
+    if timer:
+        timer.start()
+    try:
+        stdout_lines = []
+        for line in proc.stdout:
+            stdout_lines.append(line)
+            on_line(line.rstrip('\n'))
+        proc.wait()
+        stderr_reader.join()
+    except _RUN_ERRORS:
+        if timer:
+            timer.cancel()
+        raise
+    except BaseException:
+        # Raised by on_line, not the run: e.g. Streamlit's RerunException unwinding the page.
+        # The child keeps running with its timeout armed, and is untracked once it exits.
+        threading.Thread(target=_finish_detached, args=(proc, timer), daemon=True).start()
+        raise
+    if timer:
+        timer.cancel()
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(proc.args, timeout)
+    return ''.join(stdout_lines), ''.join(stderr_lines)
+
+def _finish_detached(proc, timer):
+    """Drain a child nobody is reading anymore so it can't stall on a full pipe, then untrack it."""
+    for _ in proc.stdout:
+        pass
+    proc.wait()
+    if timer:
+        timer.cancel()
+    _active_processes.discard(proc)
+
+def run_script(script_path, args=None, capture_output=True, timeout=None, on_line=None, input=None):
+    """Run a Python script with arguments.
+
+    If on_line is given, each line of stdout is passed to it while the script runs.
+    input, if given, is written to the script's stdin."""
+    cmd = list(_base_command(script_path))
     if args:
         cmd.extend(args)
     
-    result = subprocess.run(
-        cmd,
-        capture_output=capture_output,
-        text=True
-    )
+    pipe = subprocess.PIPE if capture_output else None
+    streaming = capture_output and on_line is not None
+    # Without this the child block-buffers stdout into the pipe and lines arrive in bursts
+    env = dict(os.environ, PYTHONUNBUFFERED="1") if streaming else None
+    stdin = subprocess.PIPE if input is not None else None
+    proc = subprocess.Popen(cmd, stdin=stdin, stdout=pipe, stderr=pipe, text=True, bufsize=1 if streaming else -1, env=env)
+    _active_processes.add(proc)
+    try:
+        if streaming:
+            if input is not None:
+                proc.stdin.write(input)
+                proc.stdin.close()
+            stdout, stderr = _stream_output(proc, on_line, timeout)
+        else:
+            stdout, stderr = proc.communicate(input=input, timeout=timeout)
+    except BaseException as e:
+        if streaming and not isinstance(e, _RUN_ERRORS):
+            # on_line raised; _stream_output left the child running and tracked
+            raise
+        # Same as subprocess.run: don't leave the child behind on timeout, error or interrupt
+        proc.kill()
+        proc.wait()
+        _active_processes.discard(proc)
+        raise
+    _active_processes.discard(proc)
     
     return {
-        'returncode': result.returncode,
-        'stdout': result.stdout if capture_output else None,
-        'stderr': result.stderr if capture_output else None
+        'returncode': proc.returncode,
+        'stdout': stdout if capture_output else None,
+        'stderr': stderr if capture_output else None
     }
 
-def run_gmail_parser(script_path, max_emails=10, dry_run=False, config=None):
-    """Run the Gmail parser script."""
+def _declares_option(node, option):
+    """Check whether an AST node is an argparse `add_argument(...)` call declaring option."""
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute) and node.func.attr == "add_argument"
+        and any(isinstance(arg, ast.Constant) and arg.value == option for arg in node.args)
+    )
+
+@functools.lru_cache(maxsize=32)
+def _accepts_json_stdin(script_path, mtime):
+    # Only a declared argparse option counts, not the text appearing in a comment or help string
+    try:
+        tree = ast.parse(Path(script_path).read_text())
+    except (OSError, SyntaxError, UnicodeDecodeError):
+        return False
+    return any(_declares_option(node, "--json-stdin") for node in ast.walk(tree))
+
+def run_script_json(script_path, payload, timeout=None, on_line=None):
+    """Run a script with `--json-stdin`, passing its options as a JSON object on stdin."""
+    return run_script(script_path, ["--json-stdin"], timeout=timeout, on_line=on_line, input=json.dumps(payload))
+
+def _payload_args(payload):
+    """Command-line flags for an options dict: `--key-name value`, a bare flag for True, nothing for None or False."""
     args = []
-    
-    if max_emails:
-        args.extend(["--max-emails", str(max_emails)])
-    if dry_run:
-        args.append("--dry-run")
-    if config:
-        args.extend(["--config", config])
-    
-    return run_script(script_path, args)
+    for key, value in payload.items():
+        if value is None or value is False:
+            continue
+        args.append("--" + key.replace("_", "-"))
+        if value is not True:
+            args.append(str(value))
+    return args
+
+def _run_with_options(script_path, options, on_line=None, timeout=None):
+    """Run a script with an options dict: as JSON on stdin if it declares --json-stdin, otherwise as flags."""
+    try:
+        json_stdin = _accepts_json_stdin(str(script_path), os.stat(script_path).st_mtime)
+    except OSError:
+        json_stdin = False
+    if json_stdin:
+        # Scripts that read --json-stdin get their options typed and unquoted
+        return run_script_json(script_path, {key: value for key, value in options.items() if value is not None}, timeout=timeout, on_line=on_line)
+    return run_script(script_path, _payload_args(options), timeout=timeout, on_line=on_line)
+
+def run_gmail_parser(script_path, max_emails=10, dry_run=False, config=None, on_line=None):
+    """Run the Gmail parser script."""
+    return _run_with_options(script_path, {
+        'max_emails': max_emails or None,
+        'dry_run': bool(dry_run),
+        'config': config or None,
+    }, on_line)
 
 def run_compass_enrichment(script_path, output=None, limit=None, headless=False, update_db=False, address=None):
     """Run the Compass enrichment script."""
-    args = []
-    
-    if output:
-        args.extend(["--output", output])
-    if limit:
-        args.extend(["--limit", str(limit)])
-    if headless:
-        args.append("--headless")
-    if update_db:
-        args.append("--update-db")
-    if address:
-        args.extend(["--address", address])
-    
-    return run_script(script_path, args)
+    return _run_with_options(script_path, {
+        'output': output or None,
+        'limit': limit or None,
+        'headless': bool(headless),
+        'update_db': bool(update_db),
+        'address': address or None,
+    })
 
 def run_walkscore_enrichment(script_path, address=None, limit=None, dry_run=False):
     """Run the WalkScore enrichment script."""
-    args = []
-    if address:
-        args.extend(["--address", address])
-    if limit:
-        args.extend(["--limit", str(limit)])
-    if dry_run:
-        args.append("--dry-run")
-    return run_script(script_path, args)
-
-def run_cashflow_enrichment(script_path, config_path=None, db_path=None, limit=None, dry_run=False, force_update=False, address=None):
-    """Run the Cashflow enrichment script."""
-    args = []
+    return _run_with_options(script_path, {
+        'address': address or None,
+        'limit': limit or None,
+        'dry_run': bool(dry_run),
+    })
 
-    if config_path:
-        args.extend(["--config-path", config_path])
-    if db_path:
-        args.extend(["--db-path", db_path])
-    if limit:
-        args.extend(["--limit", str(limit)])
-    if dry_run:
-        args.append("--dry-run")
-    if force_update:
-        args.append("--force-update")
-    if address:
-        args.extend(["--address", address])
-    
-    return run_script(script_path, args)
+def run_cashflow_enrichment(script_path, config_path=None, db_path=None, limit=None, dry_run=False, force_update=False, address=None, on_line=None):
+    """Run the Cashflow enrichment script."""
+    return _run_with_options(script_path, {
+        'config_path': config_path or None,
+        'db_path': db_path or None,
+        'limit': limit or None,
+        'dry_run': bool(dry_run),
+        'force_update': bool(force_update),
+        'address': address or None,
+    }, on_line)
 
 def run_init_db(script_path):
     """Run the database initialization script."""
@@ -88,63 +225,64 @@ def run_init_db(script_path):
 
 def run_cashflow_analyzer(script_path, address, down_payment, rate, insurance, misc_monthly, loan_term=None, db_path=None):
     """Run the Cashflow Analyzer script."""
-    args = ["--address", address]
-    args.extend(["--down-payment", str(down_payment)])
-    args.extend(["--rate", str(rate)])
-    args.extend(["--insurance", str(insurance)])
-    args.extend(["--misc-monthly", str(misc_monthly)])
-
-    if loan_term:
-        args.extend(["--loan-term", str(loan_term)])
-    if db_path:
-        args.extend(["--db-path", db_path])
-    
-    return run_script(script_path, args)
+    return _run_with_options(script_path, {
+        'address': address,
+        'down_payment': down_payment,
+        'rate': rate,
+        'insurance': insurance,
+        'misc_monthly': misc_monthly,
+        'loan_term': loan_term or None,
+        'db_path': db_path or None,
+    })
+
+# One pass over a line finds every progress marker on it; m.lastgroup says
+# which one matched. The counts sit in lookaheads so a "Processing ... /"
+# span doesn't swallow an Error or ✅ inside it.
+_PROGRESS_RE = re.compile(
+    r"Found(?=[ \t]*(?P<total>\d+)[ \t]*listings)"
+    r"|Processing(?=[ \t]*(?:[^/\[\n]*\[[ \t]*)?(?P<processed>\d+)[ \t]*/)"
+    r"|(?P<success>✅|Successfully)"
+    r"|(?P<failed>❌|Error|Failed)"
+)
 
 def get_script_progress(result_stdout):
     """Parse script output to get progress information."""
     if not result_stdout:
         return None
     
-    lines = result_stdout.strip().split('\n')
-    progress_info = {
+    progress_info = new_script_progress()
+    for line in result_stdout.strip().split('\n'):
+        update_script_progress(progress_info, line)
+    return progress_info
+
+def new_script_progress():
+    """Empty progress info, to be filled in by update_script_progress."""
+    return {
         'total': 0,
         'processed': 0,
         'success': 0,
         'failed': 0,
         'last_message': '',
     }
+
+def update_script_progress(progress_info, line):
+    """Fold one more line of script output into progress_info, as get_script_progress would count it.
+
+    Lets a run that streams its output keep its progress current without reparsing the whole log."""
+    line = line.strip()
+    if not line:
+        return progress_info
     
-    for line in lines:
-        line = line.strip()
-        
-        # Try to extract total count
-        if "Found" in line and "listings" in line:
-            try:
-                progress_info['total'] = int(line.split("Found")[1].split("listings")[0].strip())
-            except (ValueError, IndexError):
-                pass
-        
-        # Try to extract processed count
-        if "Processing" in line and "/" in line:
-            try:
-                parts = line.split("Processing")[1].split("/")[0].strip()
-                if "[" in parts:
-                    parts = parts.split("[")[1].strip()
-                progress_info['processed'] = int(parts)
-            except (ValueError, IndexError):
-                pass
-        
-        # Check for success messages
-        if "✅" in line or "Successfully" in line:
-            progress_info['success'] += 1
-        
-        # Check for error messages
-        if "❌" in line or "Error" in line or "Failed" in line:
-            progress_info['failed'] += 1
-        
-        # Store the last line as a message
-        if line:
-            progress_info['last_message'] = line
-    
+    # Each kind counts once per line; total and processed take the first value on it
+    seen = set()
+    for match in _PROGRESS_RE.finditer(line):
+        kind = match.lastgroup
+        if kind in seen:
+            continue
+        seen.add(kind)
+        if kind in ('total', 'processed'):
+            progress_info[kind] = int(match.group(kind))
+        else:
+            progress_info[kind] += 1
+    progress_info['last_message'] = line
     return progress_info
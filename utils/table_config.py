@@ -22,165 +22,179 @@ COLUMN_WIDTHS = {
     'mls': 100,      # For MLS numbers
 }
 
+# Column configs are built once at import. They are shared between callers,
+# so copy before changing an entry for a single table.
+_BASE_COLUMN_CONFIG = {
+    'last_updated': st.column_config.DatetimeColumn(
+        'Last Update',
+        format="MM/DD/YY",
+        width=COLUMN_WIDTHS['date']
+    ),
+    'db_updated_at': st.column_config.DatetimeColumn(
+        'DB Update',
+        format="MM/DD/YY",
+        width=COLUMN_WIDTHS['date']
+    ),
+    'days_on_compass': st.column_config.NumberColumn(
+        'Age',
+        format="%d",
+        width=COLUMN_WIDTHS['age']
+    ),
+    'address': st.column_config.TextColumn(
+        'Address',
+        width=COLUMN_WIDTHS['address']
+    ),
+    'city': st.column_config.TextColumn(
+        'City',
+        width=COLUMN_WIDTHS['city']
+    ),
+    'price': st.column_config.NumberColumn(
+        'Price',
+        format="$%d",
+        width=COLUMN_WIDTHS['price']
+    ),
+    'status': st.column_config.TextColumn(
+        'Status',
+        width=COLUMN_WIDTHS['status']
+    ),
+    'beds': st.column_config.NumberColumn(
+        'Beds',
+        width=COLUMN_WIDTHS['beds']
+    ),
+    'baths': st.column_config.NumberColumn(
+        'Baths',
+        width=COLUMN_WIDTHS['baths']
+    ),
+    'sqft': st.column_config.NumberColumn(
+        'Sq Ft',
+        format="%d",
+        width=COLUMN_WIDTHS['sqft']
+    ),
+    'price_per_sqft': st.column_config.NumberColumn(
+        '$/SQFT',
+        format="$%d",
+        width=COLUMN_WIDTHS['price']
+    ),
+    'mls_number': st.column_config.TextColumn(
+        'MLS Number',
+        width=COLUMN_WIDTHS['mls']
+    ),
+    'mls_type': st.column_config.TextColumn(
+        'MLS Type',
+        width=COLUMN_WIDTHS['mls']
+    ),
+    'walk_score': st.column_config.NumberColumn(
+        'Walk Score',
+        width=COLUMN_WIDTHS['score']
+    ),
+    'estimated_rent': st.column_config.NumberColumn(
+        'Est. Rent',
+        format="$%d",
+        width=COLUMN_WIDTHS['price']
+    ),
+    'estimated_monthly_cashflow': st.column_config.NumberColumn(
+        'Cashflow',
+        format="$%d",
+        width=COLUMN_WIDTHS['price']
+    ),
+    'rent_yield': st.column_config.NumberColumn(
+        'Rent Yield',
+        format="%.1f%%",
+        width=COLUMN_WIDTHS['percentage']
+    ),
+    'tax_information': st.column_config.TextColumn(
+        'Tax Info',
+        width=COLUMN_WIDTHS['tax_info']
+    ),
+    'url': st.column_config.LinkColumn(
+        'Compass',
+        width=COLUMN_WIDTHS['link']
+    )
+}
+
+_INTERACTIVE_COLUMN_CONFIG = {
+    **_BASE_COLUMN_CONFIG,
+    'selected': st.column_config.CheckboxColumn(
+        'Select',
+        help="Select properties to process",
+        default=False,
+        width=COLUMN_WIDTHS['checkbox']
+    )
+}
+
 def get_column_config(interactive=False):
     """Get standardized column configuration for property tables"""
-    config = {
-        'last_updated': st.column_config.DatetimeColumn(
-            'Last Update',
-            format="MM/DD/YY",
-            width=COLUMN_WIDTHS['date']
-        ),
-        'db_updated_at': st.column_config.DatetimeColumn(
-            'DB Update',
-            format="MM/DD/YY",
-            width=COLUMN_WIDTHS['date']
-        ),
-        'days_on_compass': st.column_config.NumberColumn(
-            'Age',
-            format="%d",
-            width=COLUMN_WIDTHS['age']
-        ),
-        'address': st.column_config.TextColumn(
-            'Address',
-            width=COLUMN_WIDTHS['address']
-        ),
-        'city': st.column_config.TextColumn(
-            'City',
-            width=COLUMN_WIDTHS['city']
-        ),
-        'price': st.column_config.NumberColumn(
-            'Price',
-            format="$%d",
-            width=COLUMN_WIDTHS['price']
-        ),
-        'status': st.column_config.TextColumn(
-            'Status',
-            width=COLUMN_WIDTHS['status']
-        ),
-        'beds': st.column_config.NumberColumn(
-            'Beds',
-            width=COLUMN_WIDTHS['beds']
-        ),
-        'baths': st.column_config.NumberColumn(
-            'Baths',
-            width=COLUMN_WIDTHS['baths']
-        ),
-        'sqft': st.column_config.NumberColumn(
-            'Sq Ft',
-            format="%d",
-            width=COLUMN_WIDTHS['sqft']
-        ),
-        'price_per_sqft': st.column_config.NumberColumn(
-            '$/SQFT',
-            format="$%d",
-            width=COLUMN_WIDTHS['price']
-        ),
-        'mls_number': st.column_config.TextColumn(
-            'MLS Number',
-            width=COLUMN_WIDTHS['mls']
-        ),
-        'mls_type': st.column_config.TextColumn(
-            'MLS Type',
-            width=COLUMN_WIDTHS['mls']
-        ),
-        'walk_score': st.column_config.NumberColumn(
-            'Walk Score',
-            width=COLUMN_WIDTHS['score']
-        ),
-        'estimated_rent': st.column_config.NumberColumn(
-            'Est. Rent',
-            format="$%d",
-            width=COLUMN_WIDTHS['price']
-        ),
-        'estimated_monthly_cashflow': st.column_config.NumberColumn(
-            'Cashflow',
-            format="$%d",
-            width=COLUMN_WIDTHS['price']
-        ),
-        'rent_yield': st.column_config.NumberColumn(
-            'Rent Yield',
-            format="%.1f%%",
-            width=COLUMN_WIDTHS['percentage']
-        ),
-        'tax_information': st.column_config.TextColumn(
-            'Tax Info',
-            width=COLUMN_WIDTHS['tax_info']
-        ),
-        'url': st.column_config.LinkColumn(
-            'Compass',
-            width=COLUMN_WIDTHS['link']
-        )
-    }
-    
-    if interactive:
-        config['selected'] = st.column_config.CheckboxColumn(
-            'Select',
-            help="Select properties to process",
-            default=False,
-            width=COLUMN_WIDTHS['checkbox']
-        )
-    
-    return config
+    # Shallow copy, so a page overriding one entry doesn't change it for every other table
+    return dict(_INTERACTIVE_COLUMN_CONFIG if interactive else _BASE_COLUMN_CONFIG)
+
+# Column sets for different pages/tabs. The getters hand out lists, since
+# pandas reads a tuple as a single column key.
+_COMPASS_ENRICHMENT_COLUMNS = (
+    'selected',
+    'db_updated_at',
+    'days_on_compass',
+    'status',
+    'address',
+    'city',
+    'price',
+    'url'
+)
+
+_WALKSCORE_ENRICHMENT_COLUMNS = (
+    'selected',
+    'db_updated_at',
+    'days_on_compass',
+    'status',
+    'address',
+    'city',
+    'walk_score',
+    'transit_score',
+    'bike_score',
+    'url'
+)
+
+_PROPERTY_EXPLORER_COLUMNS = (
+    'last_updated',
+    'db_updated_at',
+    'days_on_compass',
+    'address',
+    'city',
+    'price',
+    'status',
+    'beds',
+    'baths',
+    'sqft',
+    'price_per_sqft',
+    'mls_type',
+    'walk_score',
+    'estimated_rent',
+    'estimated_monthly_cashflow',
+    'rent_yield',
+    'tax_information',
+    'url'
+)
+
+_MAP_VIEW_COLUMNS = (
+    'address',
+    'price',
+    'beds',
+    'baths',
+    'sqft',
+    'url'
+)
 
-# Column sets for different pages/tabs
 def get_compass_enrichment_columns():
     """Columns to display in Compass Enrichment tab"""
-    return [
-        'selected',
-        'db_updated_at',
-        'days_on_compass',
-        'status',
-        'address',
-        'city',
-        'price',
-        'url'
-    ]
+    return list(_COMPASS_ENRICHMENT_COLUMNS)
 
 def get_walkscore_enrichment_columns():
     """Columns to display in WalkScore Enrichment tab"""
-    return [
-        'selected',
-        'db_updated_at',
-        'days_on_compass',
-        'status',
-        'address',
-        'city',
-        'walk_score',
-        'transit_score',
-        'bike_score',
-        'url'
-    ]
+    return list(_WALKSCORE_ENRICHMENT_COLUMNS)
 
 def get_property_explorer_columns():
     """Columns to display in Property Explorer main table"""
-    return [
-        'last_updated',
-        'db_updated_at',
-        'days_on_compass',
-        'address',
-        'city',
-        'price',
-        'status',
-        'beds',
-        'baths',
-        'sqft',
-        'price_per_sqft',
-        'mls_type',
-        'walk_score',
-        'estimated_rent',
-        'estimated_monthly_cashflow',
-        'rent_yield',
-        'tax_information',
-        'url'
-    ]
+    return list(_PROPERTY_EXPLORER_COLUMNS)
 
 def get_map_view_columns():
     """Columns to display in Map View table"""
-    return [
-        'address',
-        'price',
-        'beds',
-        'baths',
-        'sqft',
-        'url'
-    ] 
\ No newline at end of file
+    return list(_MAP_VIEW_COLUMNS)